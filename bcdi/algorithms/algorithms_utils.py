@@ -211,9 +211,9 @@ def deconvolution_rl(
     :param debugging: True to see plots
     :return: the deconvoluted image
     """
-    image = image.astype(np.float)
+    image = image.astype(float)
     max_img = image.max(initial=None)
-    min_img = image[np.nonzero(image)].min(initial=None)
+    min_img = image[image != 0].min(initial=None)
     image = image / min_img  # the new min is 1, to avoid dividing by values close to 0
 
     ndim = image.ndim
@@ -355,7 +355,8 @@ def richardson_lucy(image, psf, iterations=50, clip=True, guess=None):
     The algorithm is as implemented in scikit-image.restoration.deconvolution with an
     additional parameter for the initial guess of the psf.
 
-    :param image: ndarray, input degraded image (can be N dimensional).
+    :param image: ndarray, input degraded image (can be N dimensional). The
+     calculation is done in single precision if image and psf are float32.
     :param psf: ndarray, the point spread function.
     :param iterations: int, number of iterations. This parameter plays the role of
      regularisation.
@@ -383,14 +384,20 @@ def richardson_lucy(image, psf, iterations=50, clip=True, guess=None):
         convolve_method = convolve
 
     valid.valid_ndarray((image, psf))
-    image = image.astype(np.float)
-    psf = psf.astype(np.float)
+    # single precision inputs are kept in single precision, which halves the memory
+    # footprint and speeds up the convolutions, other types are converted to float
+    if image.dtype == psf.dtype == np.float32:
+        dtype = np.float32
+    else:
+        dtype = float
+    image = image.astype(dtype)
+    psf = psf.astype(dtype)
 
     if guess is not None:
         valid.valid_ndarray(guess, shape=image.shape)
-        im_deconv = guess
+        im_deconv = guess.astype(dtype, copy=False)
     else:
-        im_deconv = np.full(image.shape, 0.5)
+        im_deconv = np.full(image.shape, 0.5, dtype=dtype)
 
     psf_mirror = psf[::-1, ::-1]
 
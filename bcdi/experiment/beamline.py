@@ -30,6 +30,7 @@ Setup instance.
       init_paths(@)
       process_positions(@)
       transformation_matrix(@)
+      detector_pixel_columns()
       exit_wavevector()
       find_inplane()
       find_outofplane()
@@ -37,13 +38,14 @@ Setup instance.
       inplane_coeff()
       outofplane_coeff()
       process_tilt()
+      q_offset()
   }
     ABC <|-- Beamline
 
 """
 from abc import ABC, abstractmethod
 import h5py
-from math import isclose
+from math import cos, isclose, pi, radians, sin
 import numpy as np
 from numbers import Real
 import os
@@ -143,6 +145,45 @@ class Beamline(ABC):
         :return: "y+" or "y-"
         """
 
+    def detector_pixel_columns(
+        self,
+        matrix,
+        prefactor,
+        pixel_x,
+        pixel_y,
+        cos_inplane,
+        sin_inplane,
+        cos_outofplane,
+        sin_outofplane,
+    ):
+        """
+        Fill the columns of the transformation matrix related to the detector pixels.
+
+        The columns 0 and 1 of the transformation matrix from the detector frame to the
+        laboratory frame correspond to a step of one pixel along the horizontal and
+        vertical detector axes. They do not depend on the rocking angle, and are the
+        same for all beamlines where the detector is mounted on an inplane circle
+        rotating anti-clockwise around y (y+) carrying an out-of-plane circle. For an
+        inplane circle rotating clockwise around y (y-), pass -sin_inplane.
+
+        :param matrix: numpy ndarray of shape (3, 3) initialized with zeros, updated
+         in place
+        :param prefactor: 2 * pi / (wavelength * distance), in 1/nm^2
+        :param pixel_x: horizontal detector pixel size in nm
+        :param pixel_y: vertical detector pixel size in nm
+        :param cos_inplane: cosine of the horizontal detector angle
+        :param sin_inplane: sine of the horizontal detector angle
+        :param cos_outofplane: cosine of the vertical detector angle
+        :param sin_outofplane: sine of the vertical detector angle
+        """
+        factor = prefactor * pixel_x * self.orientation_lookup[self.detector_hor]
+        matrix[0, 0] = -factor * cos_inplane
+        matrix[2, 0] = factor * sin_inplane
+        factor = prefactor * pixel_y * self.orientation_lookup[self.detector_ver]
+        matrix[0, 1] = factor * sin_inplane * sin_outofplane
+        matrix[1, 1] = -factor * cos_outofplane
+        matrix[2, 1] = factor * cos_inplane * sin_outofplane
+
     def exit_wavevector(
         self, diffractometer, wavelength, inplane_angle, outofplane_angle
     ):
@@ -163,23 +204,21 @@ class Beamline(ABC):
 
         factor = self.orientation_lookup[diffractometer.detector_circles[index]]
 
-        kout = (
-            2
-            * np.pi
-            / wavelength
-            * np.array(
-                [
-                    np.cos(np.pi * inplane_angle / 180)
-                    * np.cos(np.pi * outofplane_angle / 180),  # z
-                    np.sin(np.pi * outofplane_angle / 180),  # y
-                    -1
-                    * factor
-                    * np.sin(np.pi * inplane_angle / 180)
-                    * np.cos(np.pi * outofplane_angle / 180),  # x
-                ]
-            )
+        # angles are scalars, math functions avoid the overhead of numpy ufuncs
+        inplane = radians(inplane_angle)
+        outofplane = radians(outofplane_angle)
+        cos_outofplane = cos(outofplane)
+        # scale the components before building the array, to allocate a single
+        # small array
+        wavenumber = 2 * pi / wavelength
+
+        return np.array(
+            [
+                wavenumber * (cos(inplane) * cos_outofplane),  # z
+                wavenumber * sin(outofplane),  # y
+                wavenumber * (-factor * sin(inplane) * cos_outofplane),  # x
+            ]
         )
-        return kout
 
     @staticmethod
     def find_inplane(diffractometer):
@@ -422,6 +461,63 @@ class Beamline(ABC):
             array = array[(nb_steps - nb_frames) // 2 : (nb_steps + nb_frames) // 2]
         return array
 
+    @staticmethod
+    def _matrix_factors(wavelength, distance, tilt, inplane, outofplane):
+        """
+        Calculate the scalar factors common to all transformation matrices.
+
+        :param wavelength: X-ray wavelength in nm
+        :param distance: detector distance in nm
+        :param tilt: angular step of the rocking curve in radians
+        :param inplane: horizontal detector angle in radians
+        :param outofplane: vertical detector angle in radians
+        :return: a tuple of:
+
+         - the prefactor 2 * pi / (wavelength * distance), in 1/nm^2
+         - the wavenumber 2 * pi / wavelength, in 1/nm
+         - the tilt factor wavenumber * tilt, in 1/nm
+         - the cosine and sine of the horizontal detector angle
+         - the cosine and sine of the vertical detector angle
+
+        """
+        wavenumber = 2 * pi / wavelength
+        return (
+            wavenumber / distance,
+            wavenumber,
+            wavenumber * tilt,
+            cos(inplane),
+            sin(inplane),
+            cos(outofplane),
+            sin(outofplane),
+        )
+
+    @staticmethod
+    def q_offset(wavenumber, cos_inplane, sin_inplane, cos_outofplane, sin_outofplane):
+        """
+        Calculate the q offset of the transformation matrix.
+
+        It is the scattering vector kout - kin at the detector angles, in the
+        laboratory frame. It is the same for all beamlines where the detector is
+        mounted on an inplane circle rotating anti-clockwise around y (y+) carrying an
+        out-of-plane circle. For an inplane circle rotating clockwise around y (y-),
+        pass -sin_inplane.
+
+        :param wavenumber: 2 * pi / wavelength, in 1/nm
+        :param cos_inplane: cosine of the horizontal detector angle
+        :param sin_inplane: sine of the horizontal detector angle
+        :param cos_outofplane: cosine of the vertical detector angle
+        :param sin_outofplane: sine of the vertical detector angle
+        :return: the q offset in 1/nm, as a numpy array of shape (3) in the order
+         (x, y, z)
+        """
+        return wavenumber * np.array(
+            [
+                cos_outofplane * sin_inplane,
+                sin_outofplane,
+                cos_inplane * cos_outofplane - 1,
+            ]
+        )
+
     @abstractmethod
     def transformation_matrix(
         self,
@@ -638,9 +734,39 @@ class BeamlineCRISTAL(Beamline):
          - the q offset (3D vector)
 
         """
-        lambdaz = wavelength * distance
+        (
+            prefactor,
+            wavenumber,
+            tilt_factor,
+            cos_inplane,
+            sin_inplane,
+            cos_outofplane,
+            sin_outofplane,
+        ) = self._matrix_factors(
+            wavelength=wavelength,
+            distance=distance,
+            tilt=tilt,
+            inplane=inplane,
+            outofplane=outofplane,
+        )
         mymatrix = np.zeros((3, 3))
-        q_offset = np.zeros(3)
+        self.detector_pixel_columns(
+            matrix=mymatrix,
+            prefactor=prefactor,
+            pixel_x=pixel_x,
+            pixel_y=pixel_y,
+            cos_inplane=cos_inplane,
+            sin_inplane=sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
+        q_offset = self.q_offset(
+            wavenumber=wavenumber,
+            cos_inplane=cos_inplane,
+            sin_inplane=sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
 
         if verbose:
             print("using CRISTAL geometry")
@@ -653,53 +779,8 @@ class BeamlineCRISTAL(Beamline):
             if verbose:
                 print("rocking angle is mgomega")
             # rocking mgomega angle clockwise around x
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        0,
-                        1 - np.cos(inplane) * np.cos(outofplane),
-                        np.sin(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
-            )
+            mymatrix[1, 2] = tilt_factor * (1 - cos_inplane * cos_outofplane)
+            mymatrix[2, 2] = tilt_factor * sin_outofplane
 
         elif rocking_angle == "inplane":
             if isinstance(grazing_angle, Real):
@@ -714,61 +795,17 @@ class BeamlineCRISTAL(Beamline):
             if verbose:
                 print(
                     "rocking angle is phi,"
-                    f" mgomega={grazing_angle[0] * 180 / np.pi:.3f} deg"
+                    f" mgomega={grazing_angle[0] * 180 / pi:.3f} deg"
                 )
+            cos_mgomega, sin_mgomega = cos(grazing_angle[0]), sin(grazing_angle[0])
             # rocking phi angle anti-clockwise around y,
             # incident angle mgomega is non zero (mgomega below phi)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        (
-                            -np.sin(grazing_angle[0]) * np.sin(outofplane)
-                            - np.cos(grazing_angle[0])
-                            * (np.cos(inplane) * np.cos(outofplane) - 1)
-                        ),
-                        np.sin(grazing_angle[0]) * np.sin(inplane) * np.cos(outofplane),
-                        np.cos(grazing_angle[0]) * np.sin(inplane) * np.cos(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
+            mymatrix[0, 2] = tilt_factor * (
+                -sin_mgomega * sin_outofplane
+                - cos_mgomega * (cos_inplane * cos_outofplane - 1)
             )
+            mymatrix[1, 2] = tilt_factor * sin_mgomega * sin_inplane * cos_outofplane
+            mymatrix[2, 2] = tilt_factor * cos_mgomega * sin_inplane * cos_outofplane
 
         else:
             raise NotImplementedError(f"rocking_angle={rocking_angle} not implemented")
@@ -958,9 +995,40 @@ class BeamlineID01(Beamline):
          - the q offset (3D vector)
 
         """
-        lambdaz = wavelength * distance
+        (
+            prefactor,
+            wavenumber,
+            tilt_factor,
+            cos_inplane,
+            sin_inplane,
+            cos_outofplane,
+            sin_outofplane,
+        ) = self._matrix_factors(
+            wavelength=wavelength,
+            distance=distance,
+            tilt=tilt,
+            inplane=inplane,
+            outofplane=outofplane,
+        )
         mymatrix = np.zeros((3, 3))
-        q_offset = np.zeros(3)
+        # the inplane detector circle rotates clockwise around y
+        self.detector_pixel_columns(
+            matrix=mymatrix,
+            prefactor=prefactor,
+            pixel_x=pixel_x,
+            pixel_y=pixel_y,
+            cos_inplane=cos_inplane,
+            sin_inplane=-sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
+        q_offset = self.q_offset(
+            wavenumber=wavenumber,
+            cos_inplane=cos_inplane,
+            sin_inplane=-sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
 
         if verbose:
             print("using ESRF ID01 PSIC geometry")
@@ -981,53 +1049,10 @@ class BeamlineID01(Beamline):
 
         if rocking_angle == "outofplane":
             if verbose:
-                print(
-                    f"rocking angle is eta, mu={grazing_angle[0] * 180 / np.pi:.3f} deg"
-                )
+                print(f"rocking angle is eta, mu={grazing_angle[0] * 180 / pi:.3f} deg")
             # rocking eta angle clockwise around x (phi does not matter, above eta)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-pixel_x * np.cos(inplane), 0, -pixel_x * np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        -pixel_y * np.sin(inplane) * np.sin(outofplane),
-                        -pixel_y * np.cos(outofplane),
-                        pixel_y * np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * np.array(
-                    [
-                        0,
-                        tilt * distance * (1 - np.cos(inplane) * np.cos(outofplane)),
-                        tilt * distance * np.sin(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                -2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
-            )
+            mymatrix[1, 2] = tilt_factor * (1 - cos_inplane * cos_outofplane)
+            mymatrix[2, 2] = tilt_factor * sin_outofplane
 
         elif rocking_angle == "inplane":
             if len(grazing_angle) != 2:
@@ -1035,61 +1060,18 @@ class BeamlineID01(Beamline):
             if verbose:
                 print(
                     f"rocking angle is phi,"
-                    f" mu={grazing_angle[0] * 180 / np.pi:.3f} deg,"
-                    f" eta={grazing_angle[1] * 180 / np.pi:.3f}deg"
+                    f" mu={grazing_angle[0] * 180 / pi:.3f} deg,"
+                    f" eta={grazing_angle[1] * 180 / pi:.3f}deg"
                 )
 
+            cos_eta, sin_eta = cos(grazing_angle[1]), sin(grazing_angle[1])
             # rocking phi angle clockwise around y,
             # incident angle eta is non zero (eta below phi)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-pixel_x * np.cos(inplane), 0, -pixel_x * np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        -pixel_y * np.sin(inplane) * np.sin(outofplane),
-                        -pixel_y * np.cos(outofplane),
-                        pixel_y * np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        (
-                            np.sin(grazing_angle[1]) * np.sin(outofplane)
-                            + np.cos(grazing_angle[1])
-                            * (np.cos(inplane) * np.cos(outofplane) - 1)
-                        ),
-                        np.sin(grazing_angle[1]) * np.sin(inplane) * np.cos(outofplane),
-                        np.cos(grazing_angle[1]) * np.sin(inplane) * np.cos(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                -2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
+            mymatrix[0, 2] = tilt_factor * (
+                sin_eta * sin_outofplane + cos_eta * (cos_inplane * cos_outofplane - 1)
             )
+            mymatrix[1, 2] = tilt_factor * sin_eta * sin_inplane * cos_outofplane
+            mymatrix[2, 2] = tilt_factor * cos_eta * sin_inplane * cos_outofplane
 
         else:
             raise NotImplementedError(f"rocking_angle={rocking_angle} not implemented")
@@ -1272,9 +1254,40 @@ class BeamlineNANOMAX(Beamline):
          - the q offset (3D vector)
 
         """
-        lambdaz = wavelength * distance
+        (
+            prefactor,
+            wavenumber,
+            tilt_factor,
+            cos_inplane,
+            sin_inplane,
+            cos_outofplane,
+            sin_outofplane,
+        ) = self._matrix_factors(
+            wavelength=wavelength,
+            distance=distance,
+            tilt=tilt,
+            inplane=inplane,
+            outofplane=outofplane,
+        )
         mymatrix = np.zeros((3, 3))
-        q_offset = np.zeros(3)
+        # the inplane detector circle rotates clockwise around y
+        self.detector_pixel_columns(
+            matrix=mymatrix,
+            prefactor=prefactor,
+            pixel_x=pixel_x,
+            pixel_y=pixel_y,
+            cos_inplane=cos_inplane,
+            sin_inplane=-sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
+        q_offset = self.q_offset(
+            wavenumber=wavenumber,
+            cos_inplane=cos_inplane,
+            sin_inplane=-sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
 
         if verbose:
             print("using NANOMAX geometry")
@@ -1288,53 +1301,8 @@ class BeamlineNANOMAX(Beamline):
                 print("rocking angle is theta")
             # rocking theta angle clockwise around x
             # (phi does not matter, above eta)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, -np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        -np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        0,
-                        1 - np.cos(inplane) * np.cos(outofplane),
-                        np.sin(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                -2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
-            )
+            mymatrix[1, 2] = tilt_factor * (1 - cos_inplane * cos_outofplane)
+            mymatrix[2, 2] = tilt_factor * sin_outofplane
 
         elif rocking_angle == "inplane":
             if isinstance(grazing_angle, Real):
@@ -1349,61 +1317,17 @@ class BeamlineNANOMAX(Beamline):
             if verbose:
                 print(
                     "rocking angle is phi,"
-                    f" theta={grazing_angle[0] * 180 / np.pi:.3f} deg"
+                    f" theta={grazing_angle[0] * 180 / pi:.3f} deg"
                 )
+            cos_theta, sin_theta = cos(grazing_angle[0]), sin(grazing_angle[0])
             # rocking phi angle clockwise around y,
             # incident angle theta is non zero (theta below phi)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, -np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        -np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        (
-                            np.sin(grazing_angle[0]) * np.sin(outofplane)
-                            + np.cos(grazing_angle[0])
-                            * (np.cos(inplane) * np.cos(outofplane) - 1)
-                        ),
-                        np.sin(grazing_angle[0]) * np.sin(inplane) * np.cos(outofplane),
-                        np.cos(grazing_angle[0]) * np.sin(inplane) * np.cos(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                -2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
+            mymatrix[0, 2] = tilt_factor * (
+                sin_theta * sin_outofplane
+                + cos_theta * (cos_inplane * cos_outofplane - 1)
             )
+            mymatrix[1, 2] = tilt_factor * sin_theta * sin_inplane * cos_outofplane
+            mymatrix[2, 2] = tilt_factor * cos_theta * sin_inplane * cos_outofplane
 
         else:
             raise NotImplementedError(f"rocking_angle={rocking_angle} not implemented")
@@ -1589,9 +1513,39 @@ class BeamlineP10(Beamline):
         if self.name == "P10_SAXS":
             raise ValueError("Method invalid for P10_SAXS")
 
-        lambdaz = wavelength * distance
+        (
+            prefactor,
+            wavenumber,
+            tilt_factor,
+            cos_inplane,
+            sin_inplane,
+            cos_outofplane,
+            sin_outofplane,
+        ) = self._matrix_factors(
+            wavelength=wavelength,
+            distance=distance,
+            tilt=tilt,
+            inplane=inplane,
+            outofplane=outofplane,
+        )
         mymatrix = np.zeros((3, 3))
-        q_offset = np.zeros(3)
+        self.detector_pixel_columns(
+            matrix=mymatrix,
+            prefactor=prefactor,
+            pixel_x=pixel_x,
+            pixel_y=pixel_y,
+            cos_inplane=cos_inplane,
+            sin_inplane=sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
+        q_offset = self.q_offset(
+            wavenumber=wavenumber,
+            cos_inplane=cos_inplane,
+            sin_inplane=sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
 
         if verbose:
             print("using PETRAIII P10 geometry")
@@ -1608,63 +1562,17 @@ class BeamlineP10(Beamline):
 
         if rocking_angle == "outofplane":
             if verbose:
-                print(
-                    f"rocking angle is om, mu={grazing_angle[0] * 180 / np.pi:.3f} deg"
-                )
+                print(f"rocking angle is om, mu={grazing_angle[0] * 180 / pi:.3f} deg")
+            cos_mu, sin_mu = cos(grazing_angle[0]), sin(grazing_angle[0])
             # rocking omega angle clockwise around x at mu=0,
             # chi potentially non zero (chi below omega)
             # (phi does not matter, above eta)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        np.sin(grazing_angle[0]) * np.sin(outofplane),
-                        np.cos(grazing_angle[0])
-                        * (1 - np.cos(inplane) * np.cos(outofplane))
-                        - np.sin(grazing_angle[0])
-                        * np.cos(outofplane)
-                        * np.sin(inplane),
-                        np.sin(outofplane) * np.cos(grazing_angle[0]),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
+            mymatrix[0, 2] = tilt_factor * sin_mu * sin_outofplane
+            mymatrix[1, 2] = tilt_factor * (
+                cos_mu * (1 - cos_inplane * cos_outofplane)
+                - sin_mu * cos_outofplane * sin_inplane
             )
+            mymatrix[2, 2] = tilt_factor * sin_outofplane * cos_mu
 
         elif rocking_angle == "inplane":
             if len(grazing_angle) != 3:
@@ -1676,79 +1584,26 @@ class BeamlineP10(Beamline):
             if verbose:
                 print(
                     f"rocking angle is phi,"
-                    f" mu={grazing_angle[0] * 180 / np.pi:.3f} deg,"
-                    f" om={grazing_angle[1] * 180 / np.pi:.3f} deg,"
-                    f" chi={grazing_angle[2] * 180 / np.pi:.3f} deg"
+                    f" mu={grazing_angle[0] * 180 / pi:.3f} deg,"
+                    f" om={grazing_angle[1] * 180 / pi:.3f} deg,"
+                    f" chi={grazing_angle[2] * 180 / pi:.3f} deg"
                 )
 
+            cos_om, sin_om = cos(grazing_angle[1]), sin(grazing_angle[1])
+            cos_chi, sin_chi = cos(grazing_angle[2]), sin(grazing_angle[2])
             # rocking phi angle clockwise around y,
             # omega and chi potentially non zero (chi below omega below phi)
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        (
-                            np.sin(grazing_angle[1])
-                            * np.cos(grazing_angle[2])
-                            * np.sin(outofplane)
-                            + np.cos(grazing_angle[1])
-                            * np.cos(grazing_angle[2])
-                            * (np.cos(inplane) * np.cos(outofplane) - 1)
-                        ),
-                        (
-                            -np.sin(grazing_angle[1])
-                            * np.cos(grazing_angle[2])
-                            * np.sin(inplane)
-                            * np.cos(outofplane)
-                            + np.sin(grazing_angle[2])
-                            * (np.cos(inplane) * np.cos(outofplane) - 1)
-                        ),
-                        (
-                            -np.cos(grazing_angle[1])
-                            * np.cos(grazing_angle[2])
-                            * np.sin(inplane)
-                            * np.cos(outofplane)
-                            - np.sin(grazing_angle[2]) * np.sin(outofplane)
-                        ),
-                    ]
-                )
+            mymatrix[0, 2] = tilt_factor * (
+                sin_om * cos_chi * sin_outofplane
+                + cos_om * cos_chi * (cos_inplane * cos_outofplane - 1)
             )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
+            mymatrix[1, 2] = tilt_factor * (
+                -sin_om * cos_chi * sin_inplane * cos_outofplane
+                + sin_chi * (cos_inplane * cos_outofplane - 1)
             )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
+            mymatrix[2, 2] = tilt_factor * (
+                -cos_om * cos_chi * sin_inplane * cos_outofplane
+                - sin_chi * sin_outofplane
             )
 
         else:
@@ -1792,9 +1647,9 @@ class BeamlineP10SAXS(BeamlineP10):
         # map these points to (cdi_angle, X), the measurement polar coordinates
         interp_angle = util.wrap(
             obj=np.arctan2(z_interp, -x_interp),
-            start_angle=offset_angle * np.pi / 180,
-            range_angle=np.pi,
-        )  # in radians, located in the range [start_angle, start_angle+np.pi[
+            start_angle=radians(offset_angle),
+            range_angle=pi,
+        )  # in radians, located in the range [start_angle, start_angle+pi[
 
         sign_array = -1 * np.sign(np.cos(interp_angle)) * np.sign(x_interp)
         sign_array[x_interp == 0] = np.sign(z_interp[x_interp == 0]) * np.sign(
@@ -1805,7 +1660,7 @@ class BeamlineP10SAXS(BeamlineP10):
 
         if debugging:
             gu.imshow_plot(
-                interp_angle * 180 / np.pi,
+                interp_angle * 180 / pi,
                 plot_colorbar=True,
                 scale="linear",
                 labels=("Qx (z_interp)", "Qy (x_interp)"),
@@ -1897,21 +1752,22 @@ class BeamlineP10SAXS(BeamlineP10):
         # calculate q values of the detector frame
         # for each angular position and stack them
         for idx, item in enumerate(cdi_angle):
-            angle = item * np.pi / 180
+            angle = radians(item)
+            cos_angle, sin_angle = cos(angle), sin(angle)
             if not anticlockwise:
                 rotation_matrix = np.array(
                     [
-                        [np.cos(angle), 0, -np.sin(angle)],
+                        [cos_angle, 0, -sin_angle],
                         [0, 1, 0],
-                        [np.sin(angle), 0, np.cos(angle)],
+                        [sin_angle, 0, cos_angle],
                     ]
                 )
             else:
                 rotation_matrix = np.array(
                     [
-                        [np.cos(angle), 0, np.sin(angle)],
+                        [cos_angle, 0, sin_angle],
                         [0, 1, 0],
-                        [-np.sin(angle), 0, np.cos(angle)],
+                        [-sin_angle, 0, cos_angle],
                     ]
                 )
 
@@ -1935,16 +1791,16 @@ class BeamlineP10SAXS(BeamlineP10):
 
             qlab0 = (
                 2
-                * np.pi
+                * pi
                 / wavelength
                 * (np.cos(alpha_f) * np.cos(two_theta) - beam_direction[0])
             )
             # along z* downstream
-            qlab1 = 2 * np.pi / wavelength * (np.sin(alpha_f) - beam_direction[1])
+            qlab1 = 2 * pi / wavelength * (np.sin(alpha_f) - beam_direction[1])
             # along y* vertical up
             qlab2 = (
                 2
-                * np.pi
+                * pi
                 / wavelength
                 * (np.cos(alpha_f) * np.sin(two_theta) - beam_direction[2])
             )
@@ -2189,7 +2045,21 @@ class BeamlineSIXS(Beamline):
          - the q offset (3D vector)
 
         """
-        lambdaz = wavelength * distance
+        (
+            prefactor,
+            wavenumber,
+            tilt_factor,
+            cos_inplane,
+            sin_inplane,
+            cos_outofplane,
+            sin_outofplane,
+        ) = self._matrix_factors(
+            wavelength=wavelength,
+            distance=distance,
+            tilt=tilt,
+            inplane=inplane,
+            outofplane=outofplane,
+        )
         mymatrix = np.zeros((3, 3))
         q_offset = np.zeros(3)
 
@@ -2210,85 +2080,32 @@ class BeamlineSIXS(Beamline):
             if verbose:
                 print(
                     "rocking angle is mu,"
-                    f" beta={grazing_angle[0] * 180 / np.pi:.3f} deg"
+                    f" beta={grazing_angle[0] * 180 / pi:.3f} deg"
                 )
 
+            cos_beta, sin_beta = cos(grazing_angle[0]), sin(grazing_angle[0])
             # rocking mu angle anti-clockwise around y
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array(
-                    [
-                        -np.cos(inplane),
-                        np.sin(grazing_angle[0]) * np.sin(inplane),
-                        np.cos(grazing_angle[0]) * np.sin(inplane),
-                    ]
-                )
+            factor = prefactor * pixel_x * self.orientation_lookup[self.detector_hor]
+            mymatrix[0, 0] = -factor * cos_inplane
+            mymatrix[1, 0] = factor * sin_beta * sin_inplane
+            mymatrix[2, 0] = factor * cos_beta * sin_inplane
+            factor = prefactor * pixel_y * self.orientation_lookup[self.detector_ver]
+            mymatrix[0, 1] = factor * sin_inplane * sin_outofplane
+            mymatrix[1, 1] = factor * (
+                sin_beta * cos_inplane * sin_outofplane - cos_beta * cos_outofplane
             )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        (
-                            np.sin(grazing_angle[0])
-                            * np.cos(inplane)
-                            * np.sin(outofplane)
-                            - np.cos(grazing_angle[0]) * np.cos(outofplane)
-                        ),
-                        (
-                            np.cos(grazing_angle[0])
-                            * np.cos(inplane)
-                            * np.sin(outofplane)
-                            + np.sin(grazing_angle[0]) * np.cos(outofplane)
-                        ),
-                    ]
-                )
+            mymatrix[2, 1] = factor * (
+                cos_beta * cos_inplane * sin_outofplane + sin_beta * cos_outofplane
             )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        np.cos(grazing_angle[0]) - np.cos(inplane) * np.cos(outofplane),
-                        np.sin(grazing_angle[0]) * np.sin(inplane) * np.cos(outofplane),
-                        np.cos(grazing_angle[0]) * np.sin(inplane) * np.cos(outofplane),
-                    ]
-                )
+            mymatrix[0, 2] = tilt_factor * (cos_beta - cos_inplane * cos_outofplane)
+            mymatrix[1, 2] = tilt_factor * sin_beta * sin_inplane * cos_outofplane
+            mymatrix[2, 2] = tilt_factor * cos_beta * sin_inplane * cos_outofplane
+            q_offset[0] = wavenumber * cos_outofplane * sin_inplane
+            q_offset[1] = wavenumber * (
+                cos_beta * sin_outofplane + sin_beta * cos_inplane * cos_outofplane
             )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (
-                    np.cos(grazing_angle[0]) * np.sin(outofplane)
-                    + np.sin(grazing_angle[0]) * np.cos(inplane) * np.cos(outofplane)
-                )
-            )
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (
-                    np.cos(grazing_angle[0]) * np.cos(inplane) * np.cos(outofplane)
-                    - np.sin(grazing_angle[0]) * np.sin(outofplane)
-                    - 1
-                )
+            q_offset[2] = wavenumber * (
+                cos_beta * cos_inplane * cos_outofplane - sin_beta * sin_outofplane - 1
             )
 
         else:
@@ -2459,9 +2276,39 @@ class Beamline34ID(Beamline):
          - the q offset (3D vector)
 
         """
-        lambdaz = wavelength * distance
+        (
+            prefactor,
+            wavenumber,
+            tilt_factor,
+            cos_inplane,
+            sin_inplane,
+            cos_outofplane,
+            sin_outofplane,
+        ) = self._matrix_factors(
+            wavelength=wavelength,
+            distance=distance,
+            tilt=tilt,
+            inplane=inplane,
+            outofplane=outofplane,
+        )
         mymatrix = np.zeros((3, 3))
-        q_offset = np.zeros(3)
+        self.detector_pixel_columns(
+            matrix=mymatrix,
+            prefactor=prefactor,
+            pixel_x=pixel_x,
+            pixel_y=pixel_y,
+            cos_inplane=cos_inplane,
+            sin_inplane=sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
+        q_offset = self.q_offset(
+            wavenumber=wavenumber,
+            cos_inplane=cos_inplane,
+            sin_inplane=sin_inplane,
+            cos_outofplane=cos_outofplane,
+            sin_outofplane=sin_outofplane,
+        )
 
         if verbose:
             print("using APS 34ID geometry")
@@ -2474,53 +2321,8 @@ class Beamline34ID(Beamline):
             if verbose:
                 print("rocking angle is theta, no grazing angle (phi above theta)")
             # rocking theta angle anti-clockwise around y
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        1 - np.cos(inplane) * np.cos(outofplane),
-                        0,
-                        np.sin(inplane) * np.cos(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
-            )
+            mymatrix[0, 2] = tilt_factor * (1 - cos_inplane * cos_outofplane)
+            mymatrix[2, 2] = tilt_factor * sin_inplane * cos_outofplane
 
         elif rocking_angle == "outofplane":
             if isinstance(grazing_angle, Real):
@@ -2535,57 +2337,15 @@ class Beamline34ID(Beamline):
             if verbose:
                 print(
                     "rocking angle is phi,"
-                    f" theta={grazing_angle[0] * 180 / np.pi:.3f} deg"
+                    f" theta={grazing_angle[0] * 180 / pi:.3f} deg"
                 )
+            cos_theta, sin_theta = cos(grazing_angle[0]), sin(grazing_angle[0])
             # rocking phi angle anti-clockwise around x
-            mymatrix[:, 0] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_x
-                * self.orientation_lookup[self.detector_hor]
-                * np.array([-np.cos(inplane), 0, np.sin(inplane)])
-            )
-            mymatrix[:, 1] = (
-                2
-                * np.pi
-                / lambdaz
-                * pixel_y
-                * self.orientation_lookup[self.detector_ver]
-                * np.array(
-                    [
-                        np.sin(inplane) * np.sin(outofplane),
-                        -np.cos(outofplane),
-                        np.cos(inplane) * np.sin(outofplane),
-                    ]
-                )
-            )
-            mymatrix[:, 2] = (
-                2
-                * np.pi
-                / lambdaz
-                * tilt
-                * distance
-                * np.array(
-                    [
-                        -np.sin(grazing_angle[0]) * np.sin(outofplane),
-                        np.cos(grazing_angle[0])
-                        * (np.cos(inplane) * np.cos(outofplane) - 1),
-                        -np.cos(grazing_angle[0]) * np.sin(outofplane),
-                    ]
-                )
-            )
-            q_offset[0] = (
-                2 * np.pi / lambdaz * distance * np.cos(outofplane) * np.sin(inplane)
-            )
-            q_offset[1] = 2 * np.pi / lambdaz * distance * np.sin(outofplane)
-            q_offset[2] = (
-                2
-                * np.pi
-                / lambdaz
-                * distance
-                * (np.cos(inplane) * np.cos(outofplane) - 1)
+            mymatrix[0, 2] = -tilt_factor * sin_theta * sin_outofplane
+            mymatrix[1, 2] = (
+                tilt_factor * cos_theta * (cos_inplane * cos_outofplane - 1)
             )
+            mymatrix[2, 2] = -tilt_factor * cos_theta * sin_outofplane
 
         else:
             raise NotImplementedError(f"rocking_angle={rocking_angle} not implemented")
@@ -42,6 +42,7 @@ following diagram).
       unbinned_pixel_number(@)
       unbinned_pixel_size(@)
       _background_subtraction()
+      _fits_in_place()
       _flatfield_correction()
       _hotpixels_correction()
       _linearity_correction()
@@ -122,6 +123,10 @@ class Detector(ABC):
 
     """
 
+    # regions of the unbinned detector to mask (e.g. gaps between sensors), as a
+    # tuple of indices for 2D arrays. It should be overriden in child classes.
+    _gaps = ()
+
     def __init__(
         self,
         name,
@@ -501,12 +506,15 @@ class Detector(ABC):
         """
         Apply background subtraction to the data.
 
-        :param data: a 2D numpy ndarray
+        :param data: a 2D numpy ndarray, modified in place if its type can hold the
+         result
         :param background: None or a 2D numpy array
         :return: the corrected data array
         """
         if background is not None:
             valid.valid_ndarray((data, background), ndim=2)
+            if Detector._fits_in_place(data, background):
+                return np.subtract(data, background, out=data)
             return data - background
         return data
 
@@ -515,15 +523,32 @@ class Detector(ABC):
         """
         Apply flatfield correction to the data (multiplication).
 
-        :param data: a 2D numpy ndarray
+        :param data: a 2D numpy ndarray, modified in place if its type can hold the
+         result
         :param flatfield: None or a 2D numpy array
         :return: the corrected data array
         """
         if flatfield is not None:
             valid.valid_ndarray((data, flatfield), ndim=2)
+            if Detector._fits_in_place(data, flatfield):
+                return np.multiply(flatfield, data, out=data)
             return np.multiply(flatfield, data)
         return data
 
+    @staticmethod
+    def _fits_in_place(data, array):
+        """
+        Check if the result of an operation between data and array fits in data.
+
+        This avoids allocating a new frame for each correction, when data is already of
+        the resulting type (e.g. float data with a float flatfield).
+
+        :param data: a 2D numpy ndarray
+        :param array: a 2D numpy ndarray combined with data
+        :return: True if the result can be written in data
+        """
+        return data.shape == array.shape and np.result_type(data, array) == data.dtype
+
     @staticmethod
     def _hotpixels_correction(data, mask, hotpixels):
         """
@@ -536,11 +561,13 @@ class Detector(ABC):
         """
         if hotpixels is not None:
             valid.valid_ndarray((data, mask, hotpixels), ndim=2)
-            if ((hotpixels == 0).sum() + (hotpixels == 1).sum()) != hotpixels.size:
+            # the boolean array of hotpixels is reused for masking
+            is_hotpixel = hotpixels == 1
+            if ((hotpixels == 0).sum() + is_hotpixel.sum()) != hotpixels.size:
                 raise ValueError("hotpixels should be an array of 0 and 1")
 
-            data[hotpixels == 1] = 0
-            mask[hotpixels == 1] = 1
+            data[is_hotpixel] = 0
+            mask[is_hotpixel] = 1
 
         return data, mask
 
@@ -605,6 +632,8 @@ class Detector(ABC):
         """
         Mask the gaps between sensors in the detector.
 
+        The regions to mask are defined in the class attribute _gaps.
+
         :param data: a 2D numpy array
         :param mask: a 2D numpy array of the same shape as data
         :return:
@@ -616,6 +645,9 @@ class Detector(ABC):
         valid.valid_ndarray(
             (data, mask), ndim=2, shape=self.unbinned_pixel_number, fix_shape=True
         )
+        for region in self._gaps:
+            data[region] = 0
+            mask[region] = 1
         return data, mask
 
     def _saturation_correction(self, data, mask, nb_frames):
@@ -641,43 +673,33 @@ class Detector(ABC):
             valid.valid_item(
                 nb_frames, allowed_types=int, min_excluded=0, name="nb_frames"
             )
-            mask[data > self.saturation_threshold * nb_frames] = 1
-            data[data > self.saturation_threshold * nb_frames] = 0
+            threshold = self.saturation_threshold * nb_frames
+            if np.issubdtype(data.dtype, np.integer):
+                # compare integer data with the integer part of the threshold, which
+                # avoids converting the whole frame to float
+                if threshold >= np.iinfo(data.dtype).max:
+                    return data, mask
+                threshold = int(threshold)
+            is_saturated = data > threshold
+            mask[is_saturated] = 1
+            data[is_saturated] = 0
         return data, mask
 
 
 class Maxipix(Detector):
     """Implementation of the Maxipix detector."""
 
+    _gaps = (
+        np.s_[:, 255:261],
+        np.s_[255:261, :],
+    )
+
     def __init__(self, name, **kwargs):
         super().__init__(name=name, **kwargs)
         self._counter_table = {"ID01": "mpx4inr"}  # useful if the same type of detector
         # is used at several beamlines
         self.saturation_threshold = 1e6
 
-    def _mask_gaps(self, data, mask):
-        """
-        Mask the gaps between sensors in the detector.
-
-        :param data: a 2D numpy array
-        :param mask: a 2D numpy array of the same shape as data
-        :return:
-
-         - the masked data
-         - the updated mask
-
-        """
-        valid.valid_ndarray(
-            (data, mask), ndim=2, shape=self.unbinned_pixel_number, fix_shape=True
-        )
-
-        data[:, 255:261] = 0
-        data[255:261, :] = 0
-
-        mask[:, 255:261] = 1
-        mask[255:261, :] = 1
-        return data, mask
-
     @property
     def unbinned_pixel_number(self):
         """
@@ -696,59 +718,29 @@ class Maxipix(Detector):
 class Eiger2M(Detector):
     """Implementation of the Eiger2M detector."""
 
+    _gaps = (
+        np.s_[:, 255:259],
+        np.s_[:, 513:517],
+        np.s_[:, 771:775],
+        np.s_[0:257, 72:80],
+        np.s_[255:259, :],
+        np.s_[511:552, :],
+        np.s_[804:809, :],
+        np.s_[1061:1102, :],
+        np.s_[1355:1359, :],
+        np.s_[1611:1652, :],
+        np.s_[1905:1909, :],
+        np.s_[1248:1290, 478],
+        np.s_[1214:1298, 481],
+        np.s_[1649:1910, 620:628],
+    )
+
     def __init__(self, name, **kwargs):
         super().__init__(name=name, **kwargs)
         self._counter_table = {"ID01": "ei2minr"}  # useful if the same type of detector
         # is used at several beamlines
         self.saturation_threshold = 1e6
 
-    def _mask_gaps(self, data, mask):
-        """
-        Mask the gaps between sensors in the detector.
-
-        :param data: a 2D numpy array
-        :param mask: a 2D numpy array of the same shape as data
-        :return:
-
-         - the masked data
-         - the updated mask
-
-        """
-        valid.valid_ndarray(
-            (data, mask), ndim=2, shape=self.unbinned_pixel_number, fix_shape=True
-        )
-
-        data[:, 255:259] = 0
-        data[:, 513:517] = 0
-        data[:, 771:775] = 0
-        data[0:257, 72:80] = 0
-        data[255:259, :] = 0
-        data[511:552, :] = 0
-        data[804:809, :] = 0
-        data[1061:1102, :] = 0
-        data[1355:1359, :] = 0
-        data[1611:1652, :] = 0
-        data[1905:1909, :] = 0
-        data[1248:1290, 478] = 0
-        data[1214:1298, 481] = 0
-        data[1649:1910, 620:628] = 0
-
-        mask[:, 255:259] = 1
-        mask[:, 513:517] = 1
-        mask[:, 771:775] = 1
-        mask[0:257, 72:80] = 1
-        mask[255:259, :] = 1
-        mask[511:552, :] = 1
-        mask[804:809, :] = 1
-        mask[1061:1102, :] = 1
-        mask[1355:1359, :] = 1
-        mask[1611:1652, :] = 1
-        mask[1905:1909, :] = 1
-        mask[1248:1290, 478] = 1
-        mask[1214:1298, 481] = 1
-        mask[1649:1910, 620:628] = 1
-        return data, mask
-
     @property
     def unbinned_pixel_number(self):
         """
@@ -767,45 +759,21 @@ class Eiger2M(Detector):
 class Eiger4M(Detector):
     """Implementation of the Eiger4M detector."""
 
+    _gaps = (
+        np.s_[:, 0:1],
+        np.s_[:, -1:],
+        np.s_[0:1, :],
+        np.s_[-1:, :],
+        np.s_[:, 1029:1041],
+        np.s_[513:552, :],
+        np.s_[1064:1103, :],
+        np.s_[1615:1654, :],
+    )
+
     def __init__(self, name, **kwargs):
         super().__init__(name=name, **kwargs)
         self.saturation_threshold = 4000000000
 
-    def _mask_gaps(self, data, mask):
-        """
-        Mask the gaps between sensors in the detector.
-
-        :param data: a 2D numpy array
-        :param mask: a 2D numpy array of the same shape as data
-        :return:
-
-         - the masked data
-         - the updated mask
-
-        """
-        valid.valid_ndarray(
-            (data, mask), ndim=2, shape=self.unbinned_pixel_number, fix_shape=True
-        )
-
-        data[:, 0:1] = 0
-        data[:, -1:] = 0
-        data[0:1, :] = 0
-        data[-1:, :] = 0
-        data[:, 1029:1041] = 0
-        data[513:552, :] = 0
-        data[1064:1103, :] = 0
-        data[1615:1654, :] = 0
-
-        mask[:, 0:1] = 1
-        mask[:, -1:] = 1
-        mask[0:1, :] = 1
-        mask[-1:, :] = 1
-        mask[:, 1029:1041] = 1
-        mask[513:552, :] = 1
-        mask[1064:1103, :] = 1
-        mask[1615:1654, :] = 1
-        return data, mask
-
     @property
     def unbinned_pixel_number(self):
         """
@@ -845,33 +813,15 @@ class Timepix(Detector):
 class Merlin(Detector):
     """Implementation of the Merlin detector."""
 
+    _gaps = (
+        np.s_[:, 255:260],
+        np.s_[255:260, :],
+    )
+
     def __init__(self, name, **kwargs):
         super().__init__(name=name, **kwargs)
         self.saturation_threshold = 1e6
 
-    def _mask_gaps(self, data, mask):
-        """
-        Mask the gaps between sensors in the detector.
-
-        :param data: a 2D numpy array
-        :param mask: a 2D numpy array of the same shape as data
-        :return:
-
-         - the masked data
-         - the updated mask
-
-        """
-        valid.valid_ndarray(
-            (data, mask), ndim=2, shape=self.unbinned_pixel_number, fix_shape=True
-        )
-
-        data[:, 255:260] = 0
-        data[255:260, :] = 0
-
-        mask[:, 255:260] = 1
-        mask[255:260, :] = 1
-        return data, mask
-
     @property
     def unbinned_pixel_number(self):
         """
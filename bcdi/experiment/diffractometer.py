@@ -671,8 +671,9 @@ class Diffractometer(ABC):
             reciprocal_space=reciprocal_space,
             **kwargs,
         )
+        # the rotation matrix is orthogonal, its inverse is its transpose
         rotated_q = util.rotate_vector(
-            vectors=q_com, rotation_matrix=np.linalg.inv(rotation_matrix)
+            vectors=q_com, rotation_matrix=rotation_matrix.transpose()
         )
         return rotated_arrays, rotated_q
 
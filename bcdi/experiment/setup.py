@@ -14,13 +14,22 @@ You can think of it as the public interface for the Beamline and Diffractometer
 classes. A script would call a method from Setup, which would then retrieve the required
 beamline-dependent information from the child classes.
 """
+
+try:
+    import cupy
+    from cupyx.scipy.ndimage import map_coordinates as gpu_map_coordinates
+except ModuleNotFoundError:
+    cupy = None
+
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 import datetime
-import gc
+from math import radians
 import multiprocessing as mp
 from numbers import Real, Integral
 import numpy as np
 from scipy.interpolate import griddata, RegularGridInterpolator
+from scipy.ndimage import map_coordinates
 import sys
 import time
 from ..graph import graph_utils as gu
@@ -84,6 +93,39 @@ class Setup:
 
     """
 
+    __slots__ = (
+        "_actuators",
+        "_beam_direction",
+        "_beamline",
+        "_custom_images",
+        "_custom_monitor",
+        "_custom_motors",
+        "_custom_scan",
+        "_detector",
+        "_diffractometer",
+        "_direct_beam",
+        "_distance",
+        "_energy",
+        "_filtered_data",
+        "_grazing_angle",
+        "_grazing_radians",
+        "_inplane_angle",
+        "_inplane_coeff",
+        "_inplane_radians",
+        "_is_series",
+        "_outofplane_angle",
+        "_outofplane_coeff",
+        "_outofplane_radians",
+        "_rocking_angle",
+        "_tilt_angle",
+        "_transformation_matrices",
+        "_wavelength",
+        "follow_bragg",
+        "offset_inplane",
+        "sample_inplane",
+        "sample_outofplane",
+    )
+
     labframe_to_xrayutil = {
         "x+": "y+",
         "x-": "y-",
@@ -159,6 +201,9 @@ class Setup:
         self.rocking_angle = rocking_angle
         self.grazing_angle = grazing_angle
 
+        # cache of the transformation matrices calculated in transformation_bcdi
+        self._transformation_matrices = {}
+
         # create the Diffractometer instance
         self._diffractometer = create_diffractometer(
             beamline=self.beamline,
@@ -227,6 +272,9 @@ class Setup:
     @beamline.setter
     def beamline(self, name):
         self._beamline = create_beamline(name=name)
+        # the detector orientation coefficients are calculated on the first access
+        self._inplane_coeff = None
+        self._outofplane_coeff = None
 
     @property
     def custom_images(self):
@@ -409,10 +457,12 @@ class Setup:
     def energy(self, value):
         if value is None:
             self._energy = value
+            self._wavelength = None
         elif isinstance(value, Real):
             if value <= 0:
                 raise ValueError("energy should be strictly positive, in eV")
             self._energy = value
+            self._wavelength = 12.398 * 1e-7 / value  # in m
         elif isinstance(value, (list, tuple, np.ndarray)):
             if len(value) == 0:
                 raise ValueError(
@@ -421,6 +471,7 @@ class Setup:
             if any(val <= 0 for val in value):
                 raise ValueError("energy should be strictly positive, in eV")
             self._energy = value
+            self._wavelength = 12.398 * 1e-7 / np.asarray(value)  # in m
         else:
             raise TypeError("energy should be a number or a list of numbers, in eV")
 
@@ -499,6 +550,10 @@ class Setup:
             # there is no sample rocking for energy scans,
             # hence the grazing angle value do not matter
             self._grazing_angle = None
+        if self._grazing_angle is None:
+            self._grazing_radians = None
+        else:
+            self._grazing_radians = [radians(val) for val in self._grazing_angle]
 
     @property
     def incident_wavevector(self):
@@ -522,6 +577,7 @@ class Setup:
         if not isinstance(value, Real) and value is not None:
             raise TypeError("inplane_angle should be a number in degrees")
         self._inplane_angle = value
+        self._inplane_radians = None if value is None else radians(value)
 
     @property
     def inplane_coeff(self):
@@ -533,7 +589,9 @@ class Setup:
 
         :return: +1 or -1
         """
-        return self._beamline.inplane_coeff(self.diffractometer)
+        if self._inplane_coeff is None:
+            self._inplane_coeff = self._beamline.inplane_coeff(self.diffractometer)
+        return self._inplane_coeff
 
     @property
     def is_series(self):
@@ -556,6 +614,7 @@ class Setup:
         if not isinstance(value, Real) and value is not None:
             raise TypeError("outofplane_angle should be a number in degrees")
         self._outofplane_angle = value
+        self._outofplane_radians = None if value is None else radians(value)
 
     @property
     def outofplane_coeff(self):
@@ -567,7 +626,11 @@ class Setup:
 
         :return: +1 or -1
         """
-        return self._beamline.outofplane_coeff(self.diffractometer)
+        if self._outofplane_coeff is None:
+            self._outofplane_coeff = self._beamline.outofplane_coeff(
+                self.diffractometer
+            )
+        return self._outofplane_coeff
 
     @property
     def params(self):
@@ -648,11 +711,8 @@ class Setup:
 
     @property
     def wavelength(self):
-        """Wavelength in meters."""
-        if self.energy:
-            return 12.398 * 1e-7 / self.energy  # in m
-        else:
-            return None
+        """Wavelength in meters, updated when the energy is set."""
+        return self._wavelength
 
     def __repr__(self):
         """Representation string of the Setup instance."""
@@ -681,6 +741,200 @@ class Setup:
             f"is_series={self.is_series})"
         )
 
+    @staticmethod
+    def _interpolate(array, indices, shape, fill_value=0, use_gpu=False):
+        """
+        Interpolate a 3D array at fractional voxel indices.
+
+        Real arrays are interpolated linearly, complex arrays separately for their real
+        and imaginary parts. Integer and boolean arrays (e.g. masks or supports) are
+        interpolated using the nearest neighbour, in order to keep their values.
+
+        :param array: the 3D numpy ndarray to interpolate
+        :param indices: numpy ndarray of shape (3, N), fractional indices (z, y, x)
+         of the N points in array where to interpolate
+        :param shape: shape of the interpolated array, the product should be N
+        :param fill_value: value used for points outside of array
+        :param use_gpu: True to interpolate on the GPU with CuPy, it falls back to
+         the CPU if CuPy is not installed
+        :return: the interpolated array, of the same type as array
+        """
+        if use_gpu and cupy is None:
+            print("CuPy is not installed, interpolating on the CPU")
+            use_gpu = False
+        if use_gpu:
+            indices = cupy.asarray(indices)
+
+            def interpolate(data, order, cval):
+                return cupy.asnumpy(
+                    gpu_map_coordinates(
+                        cupy.asarray(data), indices, order=order, cval=cval
+                    )
+                )
+
+        else:
+            # no copy for the (3, N) array of indices built by Setup._transform_grid
+            indices = np.ascontiguousarray(indices)
+
+            def interpolate(data, order, cval):
+                return map_coordinates(
+                    data, indices, order=order, mode="constant", cval=cval
+                )
+
+        dtype = array.dtype
+        if np.iscomplexobj(array):
+            output = np.empty(indices.shape[1], dtype=array.dtype)
+            output.real = interpolate(array.real, order=1, cval=fill_value)
+            output.imag = interpolate(array.imag, order=1, cval=0)
+        elif dtype == bool or np.issubdtype(dtype, np.integer):
+            if dtype == bool:
+                array = array.view(np.uint8)
+            output = interpolate(array, order=0, cval=fill_value)
+        else:
+            output = interpolate(array, order=1, cval=fill_value)
+        return output.reshape(shape).astype(dtype, copy=False)
+
+    def _interpolate_arrays(
+        self, arrays, matrix, axes, offset, fill_value, dtype=None, use_gpu=False
+    ):
+        """
+        Interpolate several 3D arrays on the points of a transformed regular grid.
+
+        The fractional indices of the grid points in the arrays are calculated with
+        Setup._transform_grid. On the CPU, the grid is processed by slabs of planes
+        along its first axis, small enough for their positions to stay in the CPU
+        cache, the slabs being interpolated concurrently in threads (scipy.ndimage
+        releases the GIL). On the GPU, the whole grid is processed at once to transfer
+        the arrays only once.
+
+        :param arrays: sequence of 3D numpy ndarrays of the same shape
+        :param matrix: numpy ndarray of shape (3, 3), the transformation from the grid
+         coordinates (x, y, z) to the fractional indices in the arrays
+        :param axes: tuple of three 1D numpy ndarrays, the coordinates of the grid
+         points along z, y and x
+        :param offset: sequence of three numbers (z, y, x) added to the fractional
+         indices
+        :param fill_value: sequence of values used for points outside of the arrays,
+         one per array
+        :param dtype: if not None, the arrays are converted to this type before the
+         interpolation
+        :param use_gpu: True to interpolate on the GPU with CuPy, it falls back to
+         the CPU if CuPy is not installed
+        :return: a list of interpolated arrays, of shape the lengths of the axes
+        """
+        if dtype is not None:
+            arrays = [array.astype(dtype, copy=False) for array in arrays]
+        # single precision is enough for the positions if all arrays are in single
+        # precision
+        single_precision = all(
+            array.dtype in (np.float32, np.complex64) for array in arrays
+        )
+        axis_z, axis_y, axis_x = axes
+        shape = (axis_z.size, axis_y.size, axis_x.size)
+        output_arrays = [np.empty(shape, dtype=array.dtype) for array in arrays]
+        if use_gpu and cupy is None:
+            print("CuPy is not installed, interpolating on the CPU")
+            use_gpu = False
+        positions_dtype = np.dtype(np.float32 if single_precision else float)
+        if use_gpu:
+            nb_planes = shape[0]
+        else:
+            # the positions of a slab should fit in about 4 MB, so that they stay in
+            # the CPU cache while each array (or real and imaginary part) is
+            # interpolated
+            plane_size = 3 * positions_dtype.itemsize * shape[1] * shape[2]
+            nb_planes = max(1, 2**22 // plane_size)
+
+        def interpolate_slab(start):
+            slab_z = axis_z[start : start + nb_planes]
+            positions = self._transform_grid(
+                matrix,
+                axes=(slab_z, axis_y, axis_x),
+                offset=offset,
+                dtype=positions_dtype,
+            )
+            if use_gpu:
+                # transfer the positions only once to the GPU
+                positions = cupy.asarray(positions)
+            for array, output, value in zip(arrays, output_arrays, fill_value):
+                output[start : start + nb_planes] = self._interpolate(
+                    array,
+                    positions,
+                    shape=(slab_z.size, *shape[1:]),
+                    fill_value=value,
+                    use_gpu=use_gpu,
+                )
+
+        starts = range(0, shape[0], nb_planes)
+        max_workers = min(mp.cpu_count(), len(starts))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # consume the iterator to raise the exceptions of the threads
+            list(executor.map(interpolate_slab, starts))
+        return output_arrays
+
+    @staticmethod
+    def _transform_grid(matrix, axes, offset=(0, 0, 0), dtype=float):
+        """
+        Apply a linear transformation to the points of a regular 3D grid.
+
+        The grid is never materialized, the transformed positions are calculated by
+        broadcasting its 1D axes.
+
+        :param matrix: numpy ndarray of shape (3, 3), the transformation acting on
+         vectors in the order (x, y, z)
+        :param axes: tuple of three 1D numpy ndarrays, the coordinates of the grid
+         points along z, y and x
+        :param offset: sequence of three numbers (z, y, x) added to the transformed
+         positions
+        :param dtype: data type of the transformed positions, float32 halves the memory
+         footprint when the interpolated arrays are in single precision
+        :return: numpy ndarray of shape (3, N), the transformed positions of the N grid
+         points, stacked in the order (z, y, x)
+        """
+        # reverse the rows and columns of the matrix to apply it directly on the
+        # (z, y, x) coordinates
+        matrix = matrix[::-1, ::-1].astype(dtype)
+        # the axes are also converted to dtype, so that the operations on the full
+        # volume are performed in that precision instead of being cast afterwards
+        axis_z = axes[0].astype(dtype, copy=False)[:, np.newaxis, np.newaxis]
+        axis_y = axes[1].astype(dtype, copy=False)[np.newaxis, :, np.newaxis]
+        axis_x = axes[2].astype(dtype, copy=False)[np.newaxis, np.newaxis, :]
+        positions = np.empty((3, axis_z.size, axis_y.size, axis_x.size), dtype=dtype)
+        for row in range(3):
+            # the offset is added to the 1D axis, not to the full volume
+            positions[row] = matrix[row, 0] * axis_z + offset[row]
+            positions[row] += matrix[row, 1] * axis_y
+            positions[row] += matrix[row, 2] * axis_x
+        return positions.reshape((3, -1))
+
+    @staticmethod
+    def _inverse_3x3(matrix):
+        """
+        Invert a 3x3 matrix using its cofactors.
+
+        This avoids the overhead of the LAPACK call in np.linalg.inv, which dominates
+        for such a small matrix.
+
+        :param matrix: numpy ndarray of shape (3, 3)
+        :return: the inverse of the matrix, numpy ndarray of shape (3, 3)
+        """
+        (a_x, b_x, c_x), (a_y, b_y, c_y), (a_z, b_z, c_z) = matrix.tolist()
+        # the rows of the inverse are the cross products b x c, c x a and a x b of the
+        # columns a, b, c of the matrix, divided by the determinant
+        cofactors = np.array(
+            [
+                [b_y * c_z - b_z * c_y, b_z * c_x - b_x * c_z, b_x * c_y - b_y * c_x],
+                [c_y * a_z - c_z * a_y, c_z * a_x - c_x * a_z, c_x * a_y - c_y * a_x],
+                [a_y * b_z - a_z * b_y, a_z * b_x - a_x * b_z, a_x * b_y - a_y * b_x],
+            ]
+        )
+        determinant = (
+            a_x * cofactors[0, 0] + a_y * cofactors[0, 1] + a_z * cofactors[0, 2]
+        )
+        if determinant == 0:
+            raise np.linalg.LinAlgError("Singular matrix")
+        return cofactors / determinant
+
     def calc_qvalues_xrutils(self, logfile, hxrd, nb_frames, **kwargs):
         """
         Calculate the 3D q values of the BCDI scan using xrayutilities.
@@ -795,13 +1049,18 @@ class Setup:
         :param kwargs:
 
          - 'title': title for the debugging plots
+         - 'use_gpu': True to interpolate on the GPU with CuPy (if installed)
 
         :return: object interpolated on an orthogonal grid
         """
         valid.valid_kwargs(
-            kwargs=kwargs, allowed_kwargs={"title"}, name="Setup.detector_frame"
+            kwargs=kwargs,
+            allowed_kwargs={"title", "use_gpu"},
+            name="Setup.detector_frame",
         )
         title = kwargs.get("title", "Object")
+        use_gpu = kwargs.get("use_gpu", False)
+        valid.valid_item(use_gpu, allowed_types=bool, name="use_gpu")
 
         if isinstance(voxel_size, Real):
             voxel_size = (voxel_size, voxel_size, voxel_size)
@@ -837,51 +1096,22 @@ class Setup:
         ################################################
         # interpolate the data into the detector frame #
         ################################################
-        myz, myy, myx = np.meshgrid(
-            np.arange(-nbz // 2, nbz // 2, 1),
-            np.arange(-nby // 2, nby // 2, 1),
-            np.arange(-nbx // 2, nbx // 2, 1),
-            indexing="ij",
-        )
-
-        new_x = (
-            ortho_matrix[0, 0] * myx
-            + ortho_matrix[0, 1] * myy
-            + ortho_matrix[0, 2] * myz
-        )
-        new_y = (
-            ortho_matrix[1, 0] * myx
-            + ortho_matrix[1, 1] * myy
-            + ortho_matrix[1, 2] * myz
-        )
-        new_z = (
-            ortho_matrix[2, 0] * myx
-            + ortho_matrix[2, 1] * myy
-            + ortho_matrix[2, 2] * myz
-        )
-        del myx, myy, myz
-        # la partie rgi est sure: c'est la taille de l'objet orthogonal de depart
-        rgi = RegularGridInterpolator(
-            (
-                np.arange(-nbz // 2, nbz // 2) * voxel_size[0],
-                np.arange(-nby // 2, nby // 2) * voxel_size[1],
-                np.arange(-nbx // 2, nbx // 2) * voxel_size[2],
+        # transform the voxel coordinates of the detector frame into fractional
+        # indices in the orthogonal object: the rows of the matrix (x, y, z) are
+        # divided by the voxel size and the voxel of index 0 is located at -n // 2
+        # along each axis.
+        (detector_obj,) = self._interpolate_arrays(
+            (obj,),
+            matrix=ortho_matrix / np.asarray(voxel_size)[::-1, np.newaxis],
+            axes=(
+                np.arange(-nbz // 2, nbz // 2, 1),
+                np.arange(-nby // 2, nby // 2, 1),
+                np.arange(-nbx // 2, nbx // 2, 1),
             ),
-            obj,
-            method="linear",
-            bounds_error=False,
-            fill_value=0,
-        )
-        detector_obj = rgi(
-            np.concatenate(
-                (
-                    new_z.reshape((1, new_z.size)),
-                    new_y.reshape((1, new_z.size)),
-                    new_x.reshape((1, new_z.size)),
-                )
-            ).transpose()
+            offset=(nbz - nbz // 2, nby - nby // 2, nbx - nbx // 2),
+            fill_value=(0,),
+            use_gpu=use_gpu,
         )
-        detector_obj = detector_obj.reshape((nbz, nby, nbx)).astype(obj.dtype)
 
         if debugging:
             gu.multislices_plot(
@@ -1225,14 +1455,10 @@ class Setup:
         )
 
         # interpolate the data onto the new points
-        tmp_array = rgi(
-            np.concatenate(
-                (
-                    interp_angle.reshape((1, interp_angle.size)),
-                    interp_radius.reshape((1, interp_angle.size)),
-                )
-            ).transpose()
-        )
+        new_positions = np.empty((interp_angle.size, 2))
+        new_positions[:, 0] = interp_angle.ravel()
+        new_positions[:, 1] = interp_radius.ravel()
+        tmp_array = rgi(new_positions)
         tmp_array = tmp_array.reshape(interp_angle.shape)
 
         return tmp_array, slice_index
@@ -1345,8 +1571,8 @@ class Setup:
         :param voxel_size: number or list of three user-defined voxel sizes for
          the interpolation, in nm. If a single number is provided, the voxel size
          will be identical in all directions.
-        :param fill_value: tuple of real numbers, fill_value parameter for the
-         RegularGridInterpolator, same length as the number of arrays
+        :param fill_value: tuple of real numbers, value used for the points
+         outside of the input arrays, same length as the number of arrays
         :param reference_axis: 3D vector along which q will be aligned, expressed in
          an orthonormal frame x y z
         :param verbose: True to have printed comments
@@ -1362,6 +1588,7 @@ class Setup:
            the initial array
          - width_x: size of the area to plot in x (axis 2), centered on the middle of
            the initial array
+         - use_gpu: True to interpolate on the GPU with CuPy (if installed)
 
         :return:
 
@@ -1383,7 +1610,7 @@ class Setup:
         #########################
         valid.valid_kwargs(
             kwargs=kwargs,
-            allowed_kwargs={"title", "width_z", "width_y", "width_x"},
+            allowed_kwargs={"title", "width_z", "width_y", "width_x", "use_gpu"},
             name="kwargs",
         )
         title = kwargs.get("title", ("Object",) * nb_arrays)
@@ -1420,6 +1647,8 @@ class Setup:
             allow_none=True,
             name="width_x",
         )
+        use_gpu = kwargs.get("use_gpu", False)
+        valid.valid_item(use_gpu, allowed_types=bool, name="use_gpu")
 
         #########################
         # check some parameters #
@@ -1524,17 +1753,17 @@ class Setup:
                     f" {pixel_x * 1e6:.2f} um)",
                 )
 
-            # sanity check, the direct space voxel sizes
-            # calculated below should be equal to the original ones
-            dz_realspace, dy_realspace, dx_realspace = self.voxel_sizes(
-                input_shape, tilt_angle=abs(tilt), pixel_x=pixel_x, pixel_y=pixel_y
-            )
-            if verbose:
+                # sanity check, the direct space voxel sizes recalculated with these
+                # parameters are equal to the original ones, they are only printed
+                check_z, check_y, check_x = self.voxel_sizes(
+                    input_shape,
+                    tilt_angle=abs(tilt),
+                    pixel_x=pixel_x,
+                    pixel_y=pixel_y,
+                )
                 print(
                     "Sanity check, recalculated direct space voxel sizes (z, y, x): ",
-                    f"({dz_realspace:.2f} nm,"
-                    f" {dy_realspace:.2f} nm,"
-                    f" {dx_realspace:.2f} nm)",
+                    f"({check_z:.2f} nm, {check_y:.2f} nm, {check_x:.2f} nm)",
                 )
         else:
             tilt = self.tilt_angle
@@ -1582,37 +1811,19 @@ class Setup:
         transfer_matrix = np.matmul(rotation_matrix, transfer_matrix)
         # transfer_matrix is the transformation matrix of the direct space coordinates
         # the spacing in the crystal frame is therefore given by the rows of the matrix
-        d_along_x = np.linalg.norm(transfer_matrix[0, :])  # along x outboard
-        d_along_y = np.linalg.norm(transfer_matrix[1, :])  # along y vertical up
-        d_along_z = np.linalg.norm(transfer_matrix[2, :])  # along z downstream
+        # norms of the rows (x outboard, y vertical up, z downstream)
+        d_along_x, d_along_y, d_along_z = np.linalg.norm(transfer_matrix, axis=1)
 
         ################################################
         # find the shape of the output array that fits #
         # the extent of the data after transformation  #
         ################################################
 
-        # calculate the voxel coordinates of the data points in the laboratory frame
-        myz, myy, myx = np.meshgrid(
-            np.arange(-input_shape[0] // 2, input_shape[0] // 2, 1),
-            np.arange(-input_shape[1] // 2, input_shape[1] // 2, 1),
-            np.arange(-input_shape[2] // 2, input_shape[2] // 2, 1),
-            indexing="ij",
-        )
-
-        pos_along_x = (
-            transfer_matrix[0, 0] * myx
-            + transfer_matrix[0, 1] * myy
-            + transfer_matrix[0, 2] * myz
-        )
-        pos_along_y = (
-            transfer_matrix[1, 0] * myx
-            + transfer_matrix[1, 1] * myy
-            + transfer_matrix[1, 2] * myz
-        )
-        pos_along_z = (
-            transfer_matrix[2, 0] * myx
-            + transfer_matrix[2, 1] * myy
-            + transfer_matrix[2, 2] * myz
+        # calculate the voxel coordinates of the corners of the data in the laboratory
+        # frame, the transformation being linear they define the data extent
+        pos_along_z, pos_along_y, pos_along_x = self._transform_grid(
+            transfer_matrix,
+            axes=[np.array([-nb // 2, nb // 2 - 1]) for nb in input_shape],
         )
 
         if verbose:
@@ -1624,8 +1835,6 @@ class Setup:
                 f" {d_along_y:.2f} nm,"
                 f" {d_along_x:.2f} nm)"
             )
-        # these positions are not equally spaced,
-        # we just extract the data extent from them
         nx_output = int(np.rint((pos_along_x.max() - pos_along_x.min()) / d_along_x))
         ny_output = int(np.rint((pos_along_y.max() - pos_along_y.min()) / d_along_y))
         nz_output = int(np.rint((pos_along_z.max() - pos_along_z.min()) / d_along_z))
@@ -1635,72 +1844,35 @@ class Setup:
         ny_output += 10
         nz_output += 10
         del pos_along_x, pos_along_y, pos_along_z
-        gc.collect()
 
         #########################################
         # calculate the interpolation positions #
         #########################################
-        myz, myy, myx = np.meshgrid(
-            np.arange(-nz_output // 2, nz_output // 2, 1) * voxel_size[0],
-            np.arange(-ny_output // 2, ny_output // 2, 1) * voxel_size[1],
-            np.arange(-nx_output // 2, nx_output // 2, 1) * voxel_size[2],
-            indexing="ij",
-        )
-
         # ortho_matrix is the transformation matrix from the detector
         # coordinates to the laboratory frame
-        # in RGI, we want to calculate the coordinates that would have
+        # for the interpolation, we want to calculate the coordinates that would have
         # a grid of the laboratory frame expressed in the
         # detector frame, i.e. one has to inverse the transformation matrix.
-        transfer_imatrix = np.linalg.inv(transfer_matrix)
-        new_x = (
-            transfer_imatrix[0, 0] * myx
-            + transfer_imatrix[0, 1] * myy
-            + transfer_imatrix[0, 2] * myz
-        )
-        new_y = (
-            transfer_imatrix[1, 0] * myx
-            + transfer_imatrix[1, 1] * myy
-            + transfer_imatrix[1, 2] * myz
-        )
-        new_z = (
-            transfer_imatrix[2, 0] * myx
-            + transfer_imatrix[2, 1] * myy
-            + transfer_imatrix[2, 2] * myz
-        )
-        del myx, myy, myz
-        gc.collect()
+        transfer_imatrix = self._inverse_3x3(transfer_matrix)
 
         ######################
         # interpolate arrays #
         ######################
-        output_arrays = []
-        for idx, array in enumerate(arrays):
-            rgi = RegularGridInterpolator(
-                (
-                    np.arange(-input_shape[0] // 2, input_shape[0] // 2, 1),
-                    np.arange(-input_shape[1] // 2, input_shape[1] // 2, 1),
-                    np.arange(-input_shape[2] // 2, input_shape[2] // 2, 1),
-                ),
-                array,
-                method="linear",
-                bounds_error=False,
-                fill_value=fill_value[idx],
-            )
-            ortho_array = rgi(
-                np.concatenate(
-                    (
-                        new_z.reshape((1, new_z.size)),
-                        new_y.reshape((1, new_z.size)),
-                        new_x.reshape((1, new_z.size)),
-                    )
-                ).transpose()
-            )
-            ortho_array = ortho_array.reshape((nz_output, ny_output, nx_output)).astype(
-                array.dtype
-            )
-            output_arrays.append(ortho_array)
-
+        # the positions are converted to fractional indices in the input arrays,
+        # the voxel of index 0 being located at -n // 2 along each axis
+        output_arrays = self._interpolate_arrays(
+            arrays,
+            matrix=transfer_imatrix,
+            axes=(
+                np.arange(-nz_output // 2, nz_output // 2, 1) * voxel_size[0],
+                np.arange(-ny_output // 2, ny_output // 2, 1) * voxel_size[1],
+                np.arange(-nx_output // 2, nx_output // 2, 1) * voxel_size[2],
+            ),
+            offset=[nb - nb // 2 for nb in input_shape],
+            fill_value=fill_value,
+            use_gpu=use_gpu,
+        )
+        for idx, (array, ortho_array) in enumerate(zip(arrays, output_arrays)):
             if debugging[idx]:
                 gu.multislices_plot(
                     abs(array),
@@ -1751,8 +1923,8 @@ class Setup:
 
         :param arrays: tuple of 3D arrays of the same shape (e.g.: reciprocal space
          diffraction pattern and mask), in the detector frame
-        :param fill_value: tuple of real numbers, fill_value parameter for the
-         RegularGridInterpolator, same length as the number of arrays
+        :param fill_value: tuple of real numbers, value used for the points
+         outside of the input arrays, same length as the number of arrays
         :param align_q: boolean, if True the data will be rotated such that q is along
          reference_axis, and q values will be calculated in the pseudo crystal frame.
         :param reference_axis: 3D vector along which q will be aligned, expressed in
@@ -1772,6 +1944,7 @@ class Setup:
            the middle of the initial array
          - width_x: size of the area to plot in x (axis 2), centered on
            the middle of the initial array
+         - use_gpu: True to interpolate on the GPU with CuPy (if installed)
 
         :return:
 
@@ -1789,7 +1962,14 @@ class Setup:
         #########################
         valid.valid_kwargs(
             kwargs=kwargs,
-            allowed_kwargs={"title", "scale", "width_z", "width_y", "width_x"},
+            allowed_kwargs={
+                "title",
+                "scale",
+                "width_z",
+                "width_y",
+                "width_x",
+                "use_gpu",
+            },
             name="kwargs",
         )
         title = kwargs.get("title", ("Object",) * nb_arrays)
@@ -1835,6 +2015,8 @@ class Setup:
             allow_none=True,
             name="width_x",
         )
+        use_gpu = kwargs.get("use_gpu", False)
+        valid.valid_item(use_gpu, allowed_types=bool, name="use_gpu")
 
         #########################
         # check some parameters #
@@ -1882,37 +2064,19 @@ class Setup:
         # the voxel size in q in the laboratory frame
         # is given by the rows of the transformation matrix
         # (the unit is 1/nm)
-        dq_along_x = np.linalg.norm(transfer_matrix[0, :])  # along x outboard
-        dq_along_y = np.linalg.norm(transfer_matrix[1, :])  # along y vertical up
-        dq_along_z = np.linalg.norm(transfer_matrix[2, :])  # along z downstream
+        # norms of the rows (x outboard, y vertical up, z downstream)
+        dq_along_x, dq_along_y, dq_along_z = np.linalg.norm(transfer_matrix, axis=1)
 
         ################################################
         # find the shape of the output array that fits #
         # the extent of the data after transformation  #
         ################################################
 
-        # calculate the q coordinates of the data points in the laboratory frame
-        myz, myy, myx = np.meshgrid(
-            np.arange(-nbz // 2, nbz // 2, 1),
-            np.arange(-nby // 2, nby // 2, 1),
-            np.arange(-nbx // 2, nbx // 2, 1),
-            indexing="ij",
-        )
-
-        q_along_x = (
-            transfer_matrix[0, 0] * myx
-            + transfer_matrix[0, 1] * myy
-            + transfer_matrix[0, 2] * myz
-        )
-        q_along_y = (
-            transfer_matrix[1, 0] * myx
-            + transfer_matrix[1, 1] * myy
-            + transfer_matrix[1, 2] * myz
-        )
-        q_along_z = (
-            transfer_matrix[2, 0] * myx
-            + transfer_matrix[2, 1] * myy
-            + transfer_matrix[2, 2] * myz
+        # calculate the q coordinates of the corners of the data in the laboratory
+        # frame, the transformation being linear they define the q extent
+        detector_corners = [np.array([-nb // 2, nb // 2 - 1]) for nb in (nbz, nby, nbx)]
+        q_along_z, q_along_y, q_along_x = self._transform_grid(
+            transfer_matrix, axes=detector_corners
         )
         if verbose:
             print(
@@ -1920,7 +2084,6 @@ class Setup:
                 f"\nSampling in q in the laboratory frame (z*, y*, x*):    "
                 f"({dq_along_z:.5f} 1/nm, {dq_along_y:.5f} 1/nm, {dq_along_x:.5f} 1/nm)"
             )
-        # these q values are not equally spaced, we just extract the q extent from them
         nx_output = int(np.rint((q_along_x.max() - q_along_x.min()) / dq_along_x))
         ny_output = int(np.rint((q_along_y.max() - q_along_y.min()) / dq_along_y))
         nz_output = int(np.rint((q_along_z.max() - q_along_z.min()) / dq_along_z))
@@ -1932,11 +2095,14 @@ class Setup:
             #######################################################################
             # the center of mass of the diffraction
             # should be in the center of the array!
-            q_along_z_com = (
-                q_along_z[nbz // 2, nby // 2, nbx // 2] + q_offset[2]
-            )  # q_offset in the order xyz
-            q_along_y_com = q_along_y[nbz // 2, nby // 2, nbx // 2] + q_offset[1]
-            q_along_x_com = q_along_x[nbz // 2, nby // 2, nbx // 2] + q_offset[0]
+            # the voxel of index n // 2 is at the position -n // 2 + n // 2 = -(n % 2)
+            center = self._transform_grid(
+                transfer_matrix,
+                axes=[np.array([-(nb % 2)]) for nb in (nbz, nby, nbx)],
+            )
+            q_along_z_com = center[0, 0] + q_offset[2]  # q_offset in the order xyz
+            q_along_y_com = center[1, 0] + q_offset[1]
+            q_along_x_com = center[2, 0] + q_offset[0]
             qnorm = np.linalg.norm(
                 np.array([q_along_x_com, q_along_y_com, q_along_z_com])
             )  # in 1/A
@@ -1959,9 +2125,8 @@ class Setup:
             # the voxel size in q in the laboratory frame
             # is given by the rows of the transformation matrix
             # (the unit is 1/nm)
-            dq_along_x = np.linalg.norm(transfer_matrix[0, :])  # along x outboard
-            dq_along_y = np.linalg.norm(transfer_matrix[1, :])  # along y vertical up
-            dq_along_z = np.linalg.norm(transfer_matrix[2, :])  # along z downstream
+            # norms of the rows (x outboard, y vertical up, z downstream)
+            dq_along_x, dq_along_y, dq_along_z = np.linalg.norm(transfer_matrix, axis=1)
 
             # calculate the new offset in the crystal frame
             # (inverse rotation to have qz along q)
@@ -1973,25 +2138,12 @@ class Setup:
             )
             q_offset = offset_crystal[::-1]  # offset_crystal is in the order z, y, x
 
-            # calculate the q coordinates of the data points in the crystal frame
-            q_along_x = (
-                transfer_matrix[0, 0] * myx
-                + transfer_matrix[0, 1] * myy
-                + transfer_matrix[0, 2] * myz
-            )
-            q_along_y = (
-                transfer_matrix[1, 0] * myx
-                + transfer_matrix[1, 1] * myy
-                + transfer_matrix[1, 2] * myz
-            )
-            q_along_z = (
-                transfer_matrix[2, 0] * myx
-                + transfer_matrix[2, 1] * myy
-                + transfer_matrix[2, 2] * myz
+            # calculate the q coordinates of the corners of the data in the crystal
+            # frame
+            q_along_z, q_along_y, q_along_x = self._transform_grid(
+                transfer_matrix, axes=detector_corners
             )
 
-            # these q values are not equally spaced,
-            # we just extract the q extent from them
             nx_output = int(np.rint((q_along_x.max() - q_along_x.min()) / dq_along_x))
             ny_output = int(np.rint((q_along_y.max() - q_along_y.min()) / dq_along_y))
             nz_output = int(np.rint((q_along_z.max() - q_along_z.min()) / dq_along_z))
@@ -2004,8 +2156,7 @@ class Setup:
                     f" {dq_along_x:.5f} 1/nm)"
                 )
 
-        del q_along_x, q_along_y, q_along_z, myx, myy, myz
-        gc.collect()
+        del q_along_x, q_along_y, q_along_z
 
         ##########################################################
         # crop the output shape in order to fit FFT requirements #
@@ -2035,70 +2186,36 @@ class Setup:
         qy = np.arange(-nx_output // 2, nx_output // 2, 1) * dq_along_x
         # along x outboard
 
-        myz, myy, myx = np.meshgrid(qx, qz, qy, indexing="ij")
-
         # transfer_matrix is the transformation matrix from
         # the detector coordinates to the laboratory/crystal frame
-        # in RGI, we want to calculate the coordinates that would have a grid
-        # of the laboratory/crystal frame expressed
+        # for the interpolation, we want to calculate the coordinates that would have
+        # a grid of the laboratory/crystal frame expressed
         # in the detector frame, i.e. one has to inverse the transformation matrix.
-        transfer_imatrix = np.linalg.inv(transfer_matrix)
-        new_x = (
-            transfer_imatrix[0, 0] * myx
-            + transfer_imatrix[0, 1] * myy
-            + transfer_imatrix[0, 2] * myz
-        )
-        new_y = (
-            transfer_imatrix[1, 0] * myx
-            + transfer_imatrix[1, 1] * myy
-            + transfer_imatrix[1, 2] * myz
-        )
-        new_z = (
-            transfer_imatrix[2, 0] * myx
-            + transfer_imatrix[2, 1] * myy
-            + transfer_imatrix[2, 2] * myz
-        )
-        del myx, myy, myz
-        gc.collect()
+        transfer_imatrix = self._inverse_3x3(transfer_matrix)
 
         ######################
         # interpolate arrays #
         ######################
-        output_arrays = []
-        for idx, array in enumerate(arrays):
-            # convert array type to float,
-            # for integers the interpolation can lead to artefacts
-            array = array.astype(float)
-            rgi = RegularGridInterpolator(
-                (
-                    np.arange(-nbz // 2, nbz // 2),
-                    np.arange(-nby // 2, nby // 2),
-                    np.arange(-nbx // 2, nbx // 2),
-                ),
-                array,
-                method="linear",
-                bounds_error=False,
-                fill_value=fill_value[idx],
-            )
-            ortho_array = rgi(
-                np.concatenate(
-                    (
-                        new_z.reshape((1, new_z.size)),
-                        new_y.reshape((1, new_z.size)),
-                        new_x.reshape((1, new_z.size)),
-                    )
-                ).transpose()
-            )
-            ortho_array = ortho_array.reshape((nz_output, ny_output, nx_output)).astype(
-                array.dtype
-            )
-            output_arrays.append(ortho_array)
-
+        # the positions are converted to fractional indices in the input arrays,
+        # the voxel of index 0 being located at -n // 2 along each axis.
+        # Convert array type to float, for integers the interpolation can lead to
+        # artefacts. Single precision arrays are kept in single precision.
+        single_precision = all(array.dtype == np.float32 for array in arrays)
+        output_arrays = self._interpolate_arrays(
+            arrays,
+            matrix=transfer_imatrix,
+            axes=(qx, qz, qy),
+            offset=(nbz - nbz // 2, nby - nby // 2, nbx - nbx // 2),
+            fill_value=fill_value,
+            dtype=np.float32 if single_precision else float,
+            use_gpu=use_gpu,
+        )
+        for idx, (array, ortho_array) in enumerate(zip(arrays, output_arrays)):
             if debugging[idx]:
                 gu.multislices_plot(
                     abs(array),
                     sum_frames=True,
-                    scale=scale,
+                    scale=scale[idx],
                     plot_colorbar=True,
                     width_z=width_z,
                     width_y=width_y,
@@ -2149,6 +2266,34 @@ class Setup:
         :return: tuple of 3 numbers, the coordinates of the vector expressed in the
          laboratory frame
         """
+        new_z, new_y, new_x = self.orthogonalize_vectors(
+            vectors=(vector,),
+            array_shape=array_shape,
+            tilt_angle=tilt_angle,
+            pixel_x=pixel_x,
+            pixel_y=pixel_y,
+            verbose=verbose,
+        )[0]
+        return new_z, new_y, new_x
+
+    def orthogonalize_vectors(
+        self, vectors, array_shape, tilt_angle, pixel_x, pixel_y, verbose=False
+    ):
+        """
+        Calculate the coordinates of several vectors in the laboratory frame.
+
+        The transformation matrix is calculated only once for all vectors.
+
+        :param vectors: sequence of N vectors of 3 coordinates (z, y, x) or numpy
+         ndarray of shape (N, 3), vectors to be transformed in the detector frame
+        :param array_shape: shape of the 3D array to orthogonalize
+        :param tilt_angle: angular step during the rocking curve, in degrees
+        :param pixel_x: horizontal pixel size, in meters
+        :param pixel_y: vertical pixel size, in meters
+        :param verbose: True to have printed comments
+        :return: numpy ndarray of shape (N, 3), the coordinates (z, y, x) of the vectors
+         expressed in the laboratory frame
+        """
         valid.valid_container(
             array_shape,
             container_types=(tuple, list),
@@ -2157,6 +2302,11 @@ class Setup:
             min_excluded=0,
             name="array_shape",
         )
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != 3:
+            raise ValueError(
+                f"vectors should be of shape (N, 3), got {vectors.shape} instead"
+            )
 
         ortho_matrix, _ = self.transformation_bcdi(
             array_shape=array_shape,
@@ -2171,23 +2321,10 @@ class Setup:
         # Here, we want to calculate the coordinates that would have
         # a vector of the laboratory frame expressed in the
         # detector frame, i.e. one has to inverse the transformation matrix.
-        ortho_imatrix = np.linalg.inv(ortho_matrix)
-        new_x = (
-            ortho_imatrix[0, 0] * vector[2]
-            + ortho_imatrix[0, 1] * vector[1]
-            + ortho_imatrix[0, 2] * vector[0]
-        )
-        new_y = (
-            ortho_imatrix[1, 0] * vector[2]
-            + ortho_imatrix[1, 1] * vector[1]
-            + ortho_imatrix[1, 2] * vector[0]
-        )
-        new_z = (
-            ortho_imatrix[2, 0] * vector[2]
-            + ortho_imatrix[2, 1] * vector[1]
-            + ortho_imatrix[2, 2] * vector[0]
-        )
-        return new_z, new_y, new_x
+        ortho_imatrix = self._inverse_3x3(ortho_matrix)
+        # ortho_imatrix acts on vectors in the order (x, y, z), reverse its rows and
+        # columns to apply it directly on the (z, y, x) vectors
+        return vectors @ ortho_imatrix[::-1, ::-1].T
 
     def transformation_bcdi(
         self, array_shape, tilt_angle, pixel_x, pixel_y, direct_space, verbose=True
@@ -2196,7 +2333,8 @@ class Setup:
         Calculate the transformation matrix from detector frame to laboratory frame.
 
         For the transformation in direct space, the length scale is in nm,
-        for the transformation in reciprocal space, it is in 1/nm.
+        for the transformation in reciprocal space, it is in 1/nm. Matrices are cached,
+        the calculation is done only once for a given set of parameters.
 
         :param array_shape: shape of the 3D array to orthogonalize
         :param tilt_angle: angular step during the rocking curve, in degrees
@@ -2216,18 +2354,37 @@ class Setup:
                 f" inplane_angle={self.inplane_angle:.3f} deg"
             )
 
-        # convert lengths to nanometers and angles to radians
+        # the matrix depends only on the geometry, reuse it if it was already
+        # calculated for the same parameters
+        key = None
+        if isinstance(self.energy, Real):
+            key = (
+                self.beamline,
+                self.energy,
+                self.distance,
+                self.outofplane_angle,
+                self.inplane_angle,
+                self.rocking_angle,
+                None if self.grazing_angle is None else tuple(self.grazing_angle),
+                tuple(array_shape),
+                tilt_angle,
+                pixel_x,
+                pixel_y,
+                direct_space,
+            )
+        if key in self._transformation_matrices:
+            # move the entry to the end, so that the least recently used one is
+            # discarded first
+            mymatrix, q_offset = self._transformation_matrices.pop(key)
+            self._transformation_matrices[key] = (mymatrix, q_offset)
+            return mymatrix.copy(), None if q_offset is None else q_offset.copy()
+
+        # convert lengths to nanometers, the detector and grazing angles are converted
+        # to radians in their setters
         wavelength = self.wavelength * 1e9  # convert to nm
         distance = self.distance * 1e9  # convert to nm
         pixel_x = pixel_x * 1e9  # convert to nm
         pixel_y = pixel_y * 1e9  # convert to nm
-        outofplane = np.radians(self.outofplane_angle)
-        inplane = np.radians(self.inplane_angle)
-        if self.grazing_angle is not None:
-            grazing_angle = [np.radians(val) for val in self.grazing_angle]
-        else:
-            grazing_angle = None
-        tilt = np.radians(tilt_angle)
 
         ###########################################################
         # calculate the transformation matrix in reciprocal space #
@@ -2237,11 +2394,11 @@ class Setup:
             distance=distance,
             pixel_x=pixel_x,
             pixel_y=pixel_y,
-            inplane=inplane,
-            outofplane=outofplane,
-            grazing_angle=grazing_angle,
+            inplane=self._inplane_radians,
+            outofplane=self._outofplane_radians,
+            grazing_angle=self._grazing_radians,
             rocking_angle=self.rocking_angle,
-            tilt=tilt,
+            tilt=radians(tilt_angle),
             verbose=verbose,
         )
 
@@ -2251,13 +2408,22 @@ class Setup:
         if direct_space:  # length scale in nm
             # for a discrete FT, the dimensions of the basis vectors
             # after the transformation are related to the total
-            # domain size
-            mymatrix[:, 0] = array_shape[2] * mymatrix[:, 0]
-            mymatrix[:, 1] = array_shape[1] * mymatrix[:, 1]
-            mymatrix[:, 2] = array_shape[0] * mymatrix[:, 2]
-            return 2 * np.pi * np.linalg.inv(mymatrix).transpose(), None
-
-        # reciprocal length scale in  1/nm
+            # domain size, the columns (x, y, z) are scaled by the number of voxels
+            mymatrix = mymatrix * np.asarray(array_shape)[::-1]
+            mymatrix = 2 * np.pi * self._inverse_3x3(mymatrix).transpose()
+            q_offset = None
+        # else reciprocal length scale in  1/nm
+
+        if key is not None:
+            if len(self._transformation_matrices) >= 32:
+                # discard the least recently used entry
+                del self._transformation_matrices[
+                    next(iter(self._transformation_matrices))
+                ]
+            self._transformation_matrices[key] = (
+                mymatrix.copy(),
+                None if q_offset is None else q_offset.copy(),
+            )
         return mymatrix, q_offset
 
     def transformation_cdi(self, arrays, direct_beam, cdi_angle, fill_value, debugging):
@@ -2336,11 +2502,12 @@ class Setup:
         else:  # padding to the left along x, need to correct the pivot position
             pivot = nbx - directbeam_x
 
-        dqx = 2 * np.pi / lambdaz * pixel_x
+        prefactor = 2 * np.pi / lambdaz
+        dqx = prefactor * pixel_x
         # in 1/nm, downstream, pixel_x is the binned pixel size
-        dqz = 2 * np.pi / lambdaz * pixel_y
+        dqz = prefactor * pixel_y
         # in 1/nm, vertical up, pixel_y is the binned pixel size
-        dqy = 2 * np.pi / lambdaz * pixel_x
+        dqy = dqx
         # in 1/nm, outboard, pixel_x is the binned pixel size
 
         ##########################################
@@ -2503,9 +2670,8 @@ class Setup:
         # non-orthogonal basis vectors reciprocal to the detector frame)
         # the spacing in the laboratory frame is therefore
         # given by the rows of the matrix
-        dx = np.linalg.norm(transfer_matrix[0, :])  # along x outboard
-        dy = np.linalg.norm(transfer_matrix[1, :])  # along y vertical up
-        dz = np.linalg.norm(transfer_matrix[2, :])  # along z downstream
+        # norms of the rows (x outboard, y vertical up, z downstream)
+        dx, dy, dz = np.linalg.norm(transfer_matrix, axis=1)
 
         if verbose:
             print(
@@ -2532,7 +2698,7 @@ class Setup:
          (voxel_z, voxel_y, voxel_x)
         """
         voxel_z = (
-            self.wavelength / (array_shape[0] * abs(tilt_angle) * np.pi / 180) * 1e9
+            self.wavelength / (array_shape[0] * radians(abs(tilt_angle))) * 1e9
         )  # in nm
         voxel_y = (
             self.wavelength * self.distance / (array_shape[1] * pixel_y) * 1e9
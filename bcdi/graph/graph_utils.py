@@ -639,11 +639,10 @@ def contour_slices(
     ##########
     # axis 0 #
     ##########
-    temp_array = np.copy(array)
     if not sum_frames:
-        temp_array = temp_array[slice_position[0], :, :]
+        temp_array = np.copy(array[slice_position[0], :, :])
     else:
-        temp_array = temp_array.sum(axis=0)
+        temp_array = array.sum(axis=0)
     # now array is 2D
     temp_array = temp_array[
         int(np.rint(nby / 2 - min(width_y, nby) / 2)) : int(
@@ -671,11 +670,10 @@ def contour_slices(
     ##########
     # axis 1 #
     ##########
-    temp_array = np.copy(array)
     if not sum_frames:
-        temp_array = temp_array[:, slice_position[1], :]
+        temp_array = np.copy(array[:, slice_position[1], :])
     else:
-        temp_array = temp_array.sum(axis=1)
+        temp_array = array.sum(axis=1)
     # now array is 2D
     temp_array = temp_array[
         int(np.rint(nbz / 2 - min(width_z, nbz) / 2)) : int(
@@ -703,11 +701,10 @@ def contour_slices(
     ##########
     # axis 2 #
     ##########
-    temp_array = np.copy(array)
     if not sum_frames:
-        temp_array = temp_array[:, :, slice_position[2]]
+        temp_array = np.copy(array[:, :, slice_position[2]])
     else:
-        temp_array = temp_array.sum(axis=2)
+        temp_array = array.sum(axis=2)
     # now array is 2D
     temp_array = temp_array[
         int(np.rint(nbz / 2 - min(width_z, nbz) / 2)) : int(
@@ -1675,11 +1672,10 @@ def multislices_plot(
     ##########
     # axis 0 #
     ##########
-    temp_array = np.copy(array)
     if not sum_frames:
-        temp_array = temp_array[slice_position[0], :, :]
+        temp_array = np.copy(array[slice_position[0], :, :])
     else:
-        temp_array = temp_array.sum(axis=0)
+        temp_array = array.sum(axis=0)
     # now array is 2D
     temp_array = temp_array[
         int(np.rint(nby // 2 - min(width_y, nby) // 2)) : int(
@@ -1738,11 +1734,10 @@ def multislices_plot(
     ##########
     # axis 1 #
     ##########
-    temp_array = np.copy(array)
     if not sum_frames:
-        temp_array = temp_array[:, slice_position[1], :]
+        temp_array = np.copy(array[:, slice_position[1], :])
     else:
-        temp_array = temp_array.sum(axis=1)
+        temp_array = array.sum(axis=1)
     # now array is 2D
     temp_array = temp_array[
         int(np.rint(nbz // 2 - min(width_z, nbz) // 2)) : int(
@@ -1799,11 +1794,10 @@ def multislices_plot(
     ##########
     # axis 2 #
     ##########
-    temp_array = np.copy(array)
     if not sum_frames:
-        temp_array = temp_array[:, :, slice_position[2]]
+        temp_array = np.copy(array[:, :, slice_position[2]])
     else:
-        temp_array = temp_array.sum(axis=2)
+        temp_array = array.sum(axis=2)
     # now array is 2D
     temp_array = temp_array[
         int(np.rint(nbz // 2 - min(width_z, nbz) // 2)) : int(
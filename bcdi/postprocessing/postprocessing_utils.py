@@ -351,9 +351,10 @@ def average_obj(
             old_y = np.arange(-nby // 2, nby // 2)
             old_x = np.arange(-nbx // 2, nbx // 2)
             myz, myy, myx = np.meshgrid(old_z, old_y, old_x, indexing="ij")
-            new_z = myz + offset_z
-            new_y = myy + offset_y
-            new_x = myx + offset_x
+            new_positions = np.empty((nbz * nby * nbx, 3))
+            new_positions[:, 0] = (myz + offset_z).ravel()
+            new_positions[:, 1] = (myy + offset_y).ravel()
+            new_positions[:, 2] = (myx + offset_x).ravel()
             del myx, myy, myz
             rgi = RegularGridInterpolator(
                 (old_z, old_y, old_x),
@@ -362,15 +363,7 @@ def average_obj(
                 bounds_error=False,
                 fill_value=0,
             )
-            new_obj = rgi(
-                np.concatenate(
-                    (
-                        new_z.reshape((1, new_z.size)),
-                        new_y.reshape((1, new_z.size)),
-                        new_x.reshape((1, new_z.size)),
-                    )
-                ).transpose()
-            )
+            new_obj = rgi(new_positions)
             new_obj = new_obj.reshape((nbz, nby, nbx)).astype(obj.dtype)
         else:
             # dft registration and subpixel shift (see Matlab code)
@@ -465,12 +458,12 @@ def blackman_window(shape, normalization=1):
     array_z = np.blackman(nbz)
     array_y = np.blackman(nby)
     array_x = np.blackman(nbx)
-    blackman2 = np.ones((nbz, nby))
-    blackman3 = np.ones((nbz, nby, nbx))
-    for idz in range(nbz):
-        blackman2[idz, :] = array_z[idz] * array_y
-        for idy in range(nby):
-            blackman3[idz, idy] = blackman2[idz, idy] * array_x
+    # the window is separable, it is the outer product of the 1D windows
+    blackman3 = (
+        array_z[:, np.newaxis, np.newaxis]
+        * array_y[np.newaxis, :, np.newaxis]
+        * array_x[np.newaxis, np.newaxis, :]
+    )
     blackman3 = blackman3 / blackman3.sum() * normalization
     return blackman3
 
@@ -1160,9 +1153,8 @@ def gaussian_kernel(ndim, kernel_length=21, sigma=3, debugging=False):
     kernel_1d = norm.pdf(np.arange(-half_range, half_range + 1, 1), 0, sigma)
 
     if ndim == 2:
-        kernel = np.ones((kernel_length, kernel_length))
-        for idy in range(kernel_length):
-            kernel[idy, :] = kernel_1d[idy] * kernel_1d
+        # the kernel is separable, it is the outer product of the 1D kernels
+        kernel = kernel_1d[:, np.newaxis] * kernel_1d[np.newaxis, :]
 
         if debugging:
             plt.figure()
@@ -1172,12 +1164,11 @@ def gaussian_kernel(ndim, kernel_length=21, sigma=3, debugging=False):
             plt.pause(0.1)
 
     elif ndim == 3:
-        kernel_2d = np.ones((kernel_length, kernel_length))
-        kernel = np.ones((kernel_length, kernel_length, kernel_length))
-        for idz in range(kernel_length):
-            kernel_2d[idz, :] = kernel_1d[idz] * kernel_1d
-            for idy in range(kernel_length):
-                kernel[idz, idy] = kernel_2d[idz, idy] * kernel_1d
+        kernel = (
+            kernel_1d[:, np.newaxis, np.newaxis]
+            * kernel_1d[np.newaxis, :, np.newaxis]
+            * kernel_1d[np.newaxis, np.newaxis, :]
+        )
 
         if debugging:
             plt.figure()
@@ -1756,21 +1747,18 @@ def regrid(array, old_voxelsize, new_voxelsize):
         old_y * new_voxelsize[1] / old_voxelsize[1],
         old_x * new_voxelsize[2] / old_voxelsize[2],
         indexing="ij",
+        sparse=True,
     )
+    new_positions = np.empty((nbz, nby, nbx, 3))
+    new_positions[..., 0] = new_z
+    new_positions[..., 1] = new_y
+    new_positions[..., 2] = new_x
 
     rgi = RegularGridInterpolator(
         (old_z, old_y, old_x), array, method="linear", bounds_error=False, fill_value=0
     )
 
-    new_array = rgi(
-        np.concatenate(
-            (
-                new_z.reshape((1, new_z.size)),
-                new_y.reshape((1, new_y.size)),
-                new_x.reshape((1, new_x.size)),
-            )
-        ).transpose()
-    )
+    new_array = rgi(new_positions.reshape((-1, 3)))
     new_array = new_array.reshape((nbz, nby, nbx)).astype(array.dtype)
     return new_array
 
@@ -2423,13 +2411,12 @@ def tukey_window(shape, alpha=np.array([0.5, 0.5, 0.5])):
     array_z = tukey(nbz, alpha[0])
     array_y = tukey(nby, alpha[1])
     array_x = tukey(nbx, alpha[2])
-    tukey2 = np.ones((nbz, nby))
-    tukey3 = np.ones((nbz, nby, nbx))
-    for idz in range(nbz):
-        tukey2[idz, :] = array_z[idz] * array_y
-        for idy in range(nby):
-            tukey3[idz, idy] = tukey2[idz, idy] * array_x
-    return tukey3
+    # the window is separable, it is the outer product of the 1D windows
+    return (
+        array_z[:, np.newaxis, np.newaxis]
+        * array_y[np.newaxis, :, np.newaxis]
+        * array_x[np.newaxis, np.newaxis, :]
+    )
 
 
 def unwrap(obj, support_threshold, seed=0, debugging=True, **kwargs):
@@ -97,9 +97,11 @@ def align_diffpattern(
             old_y = np.arange(-nby // 2, nby // 2)
             old_x = np.arange(-nbx // 2, nbx // 2)
             myz, myy, myx = np.meshgrid(old_z, old_y, old_x, indexing="ij")
-            new_z = myz - shiftz
-            new_y = myy - shifty
-            new_x = myx - shiftx
+            new_positions = np.empty((nbz * nby * nbx, 3))
+            new_positions[:, 0] = (myz - shiftz).ravel()
+            new_positions[:, 1] = (myy - shifty).ravel()
+            new_positions[:, 2] = (myx - shiftx).ravel()
+            del myz, myy, myx
 
             rgi = RegularGridInterpolator(
                 (old_z, old_y, old_x),
@@ -108,15 +110,7 @@ def align_diffpattern(
                 bounds_error=False,
                 fill_value=0,
             )
-            data = rgi(
-                np.concatenate(
-                    (
-                        new_z.reshape((1, new_z.size)),
-                        new_y.reshape((1, new_z.size)),
-                        new_x.reshape((1, new_z.size)),
-                    )
-                ).transpose()
-            )
+            data = rgi(new_positions)
             data = data.reshape((nbz, nby, nbx)).astype(reference_data.dtype)
             if mask is not None:
                 rgi = RegularGridInterpolator(
@@ -126,15 +120,7 @@ def align_diffpattern(
                     bounds_error=False,
                     fill_value=1,
                 )  # fill_value=1: mask voxels where data is not defined
-                mask = rgi(
-                    np.concatenate(
-                        (
-                            new_z.reshape((1, new_z.size)),
-                            new_y.reshape((1, new_z.size)),
-                            new_x.reshape((1, new_z.size)),
-                        )
-                    ).transpose()
-                )
+                mask = rgi(new_positions)
                 mask = mask.reshape((nbz, nby, nbx)).astype(data.dtype)
 
         else:  # 'subpixel'
@@ -171,17 +157,15 @@ def align_diffpattern(
             old_y = np.arange(-nby // 2, nby // 2)
             old_x = np.arange(-nbx // 2, nbx // 2)
             myy, myx = np.meshgrid(old_y, old_x, indexing="ij")
-            new_y = myy - shifty
-            new_x = myx - shiftx
+            new_positions = np.empty((nby * nbx, 2))
+            new_positions[:, 0] = (myy - shifty).ravel()
+            new_positions[:, 1] = (myx - shiftx).ravel()
+            del myy, myx
 
             rgi = RegularGridInterpolator(
                 (old_y, old_x), data, method="linear", bounds_error=False, fill_value=0
             )
-            data = rgi(
-                np.concatenate(
-                    (new_y.reshape((1, new_y.size)), new_x.reshape((1, new_y.size)))
-                ).transpose()
-            )
+            data = rgi(new_positions)
             data = data.reshape((nby, nbx)).astype(reference_data.dtype)
             if mask is not None:
                 rgi = RegularGridInterpolator(
@@ -192,11 +176,7 @@ def align_diffpattern(
                     fill_value=1,
                 )
                 # fill_value=1: mask voxels where data is not defined
-                mask = rgi(
-                    np.concatenate(
-                        (new_y.reshape((1, new_y.size)), new_x.reshape((1, new_y.size)))
-                    ).transpose()
-                )
+                mask = rgi(new_positions)
                 mask = mask.reshape((nby, nbx)).astype(data.dtype)
         else:  # 'subpixel'
             data = abs(
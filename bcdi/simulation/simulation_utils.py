@@ -59,7 +59,7 @@ def angle_vectors(
     return angle
 
 
-def assign_peakshape(array_shape, lattice_list, peak_shape, pivot):
+def assign_peakshape(array_shape, lattice_list, peak_shape, pivot, out=None):
     """
     Assign the 3D peak_shape to lattice points.
 
@@ -67,13 +67,34 @@ def assign_peakshape(array_shape, lattice_list, peak_shape, pivot):
     :param lattice_list: list of points in pixels [[z1,y1,x1],[z2,y2,x2],...]
     :param peak_shape: the 3D kernel to apply at each lattice point
     :param pivot: position of the center of reciprocal space in pixels
+    :param out: optional array of shape array_shape, modified in place instead of
+     allocating a new array. Only the voxels near lattice points and the origin are
+     assigned, the other voxels are not reset to 0.
     :return: a 3D array featuring the peak shape at each lattice point
     """
-    array = np.zeros(array_shape)
+    if out is None:
+        array = np.zeros(array_shape)
+    else:
+        if out.shape != tuple(array_shape):
+            raise ValueError("out should be of shape array_shape")
+        array = out
     kernel_length = peak_shape.shape[0]
+    half_length = kernel_length // 2
     # since we have a small list of peaks, do not use convolution (too slow) but for
     # loop 1 is related to indices for array, 2 is related to indices for peak_shape
     for [piz, piy, pix] in lattice_list:
+        if (
+            half_length <= piz < array_shape[0] - half_length
+            and half_length <= piy < array_shape[1] - half_length
+            and half_length <= pix < array_shape[2] - half_length
+        ):
+            # the kernel fits in the array, no need to clip it
+            array[
+                piz - half_length : piz + half_length + 1,
+                piy - half_length : piy + half_length + 1,
+                pix - half_length : pix + half_length + 1,
+            ] = peak_shape
+            continue
         startz1, startz2 = (
             max(0, int(piz - kernel_length // 2)),
             -min(0, int(piz - kernel_length // 2)),
@@ -681,13 +702,11 @@ def reciprocal_lattice(
             )
         else:
             raise ValueError("Unexpected value for input_lattice parameter")
-    w1 = 2 * np.pi / volume * np.cross(v2, v3)
-    w2 = 2 * np.pi / volume * np.cross(v3, v1)
-    w3 = 2 * np.pi / volume * np.cross(v1, v2)
+    # the three reciprocal basis vectors are calculated at once, as rows
+    reciprocal_vectors = 2 * np.pi / volume * np.cross((v2, v3, v1), (v3, v1, v2))
+    w1, w2, w3 = reciprocal_vectors
 
-    b1 = np.linalg.norm(w1)
-    b2 = np.linalg.norm(w2)
-    b3 = np.linalg.norm(w3)
+    b1, b2, b3 = np.linalg.norm(reciprocal_vectors, axis=1)
 
     alpha_r = 180 / np.pi * np.arccos(np.dot(w2, w3) / (b2 * b3))
     beta_r = 180 / np.pi * np.arccos(np.dot(w3, w1) / (b3 * b1))
@@ -715,15 +734,9 @@ def rotate_lattice(
     :return: list of Bragg peaks positions fitting into the range,
      and the corresponding list of hlk
     """
-    lattice_pos = []  # position of the pixels corresponding to hkl reflections
-    peaks = []  # list of hkl fitting the data range
-    numz, numy, numx = original_shape
-    pivot_z, pivot_y, pivot_x = pivot  # downstream, vertical up, outboard
-    (
-        leftpad_z,
-        leftpad_y,
-        leftpad_x,
-    ) = pad_offset  # offset of the 0 index in padded q values: see fcc_lattice()
+    # position of the pivot in the padded q values (offset of the 0 index in padded q
+    # values: see fcc_lattice()), in the order downstream, vertical up, outboard
+    origin = np.asarray(pivot) + np.asarray(pad_offset)
 
     # define the rotation using Euler angles with the direct beam as origin
     # (extrinsic rotations). The frame is : x colinear to qx downstream, y colinear
@@ -731,34 +744,23 @@ def rotate_lattice(
     # from the left axis
     rotation = Rotation.from_euler("xzy", euler_angles, degrees=True)
 
-    for idx, point in enumerate(lattice_list):
-        pix_h, pix_l, pix_k = point
-        # rotate the vector using Euler angles and the pivot point
-        # while compensating padding
-        offset_h, offset_l, offset_k = (
-            pix_h - (pivot_z + leftpad_z),
-            pix_l - (pivot_y + leftpad_y),
-            pix_k - (pivot_x + leftpad_x),
-        )
-
-        rot_h, rot_k, rot_l = rotation.apply([offset_h, offset_k, offset_l])
-        # coordinates order for Rotation(): [qx, qy, qz]
+    # rotate all the vectors [[pix_h, pix_l, pix_k], ...] at once using Euler angles
+    # and the pivot point while compensating padding, the coordinates order for
+    # Rotation() is [qx, qy, qz]
+    offsets = np.reshape(lattice_list, (-1, 3)) - origin
+    rotated = rotation.apply(offsets[:, [0, 2, 1]])[:, [0, 2, 1]]
 
-        # shift back the origin to (0, 0, 0)
-        rot_h, rot_l, rot_k = (
-            np.rint(rot_h + pivot_z + leftpad_z).astype(int),
-            np.rint(rot_l + pivot_y + leftpad_y).astype(int),
-            np.rint(rot_k + pivot_x + leftpad_x).astype(int),
-        )
-
-        # calculate indices in the original q values coordinates before padding
-        rot_h, rot_l, rot_k = rot_h - leftpad_z, rot_l - leftpad_y, rot_k - leftpad_x
+    # shift back the origin to (0, 0, 0) and calculate indices in the original q
+    # values coordinates before padding
+    rotated = np.rint(rotated + origin).astype(int) - np.asarray(pad_offset)
 
-        # check if the rotated peak is in the non-padded data range
-        if (0 <= rot_h < numz) and (0 <= rot_l < numy) and (0 <= rot_k < numx):
-            # use here CXI convention: downstream, vertical up, outboard
-            lattice_pos.append([rot_h, rot_l, rot_k])
-            peaks.append(peaks_list[idx])
+    # check if the rotated peaks are in the non-padded data range
+    in_range = np.logical_and(rotated >= 0, rotated < np.asarray(original_shape)).all(
+        axis=1
+    )
+    # use here CXI convention: downstream, vertical up, outboard
+    lattice_pos = rotated[in_range].tolist()
+    peaks = [peaks_list[idx] for idx in np.flatnonzero(in_range)]
 
     return lattice_pos, peaks
 
@@ -19,6 +19,7 @@ from numbers import Real, Integral
 import numpy as np
 import os
 from scipy.interpolate import interp1d, RegularGridInterpolator
+from scipy.ndimage import map_coordinates
 from scipy.optimize import curve_fit
 from scipy.special import erf
 from scipy.stats import multivariate_normal
@@ -1076,7 +1077,7 @@ def load_background(background_file):
     return background
 
 
-def load_file(file_path, fieldname=None):
+def load_file(file_path, fieldname=None, mmap_mode=None):
     """
     Load a file.
 
@@ -1086,22 +1087,20 @@ def load_file(file_path, fieldname=None):
     :param file_path: the path of the reconstruction to load.
      Format supported: .npy .npz .cxi .h5
     :param fieldname: the name of the field to be loaded
+    :param mmap_mode: None or 'r', 'r+', 'w+', 'c', used only for .npy files. If not
+     None, the array is memory-mapped instead of being read in memory (see
+     numpy.load), which is useful for large arrays that are only read.
     :return: the loaded data and the extension of the file
     """
     _, extension = os.path.splitext(file_path)
     if extension == ".npz":  # could be anything
-        if fieldname is None:  # output of PyNX phasing
-            npzfile = np.load(file_path)
-            dataset = npzfile[list(npzfile.files)[0]]
-        else:  # could be anything
-            try:
-                dataset = np.load(file_path)[fieldname]
-                return dataset, extension
-            except KeyError:
-                npzfile = np.load(file_path)
-                dataset = npzfile[list(npzfile.files)[0]]
+        with np.load(file_path) as npzfile:
+            if fieldname in npzfile.files:
+                return npzfile[fieldname], extension
+            # output of PyNX phasing, or the field does not exist
+            dataset = npzfile[npzfile.files[0]]
     elif extension == ".npy":  # could be anything
-        dataset = np.load(file_path)
+        dataset = np.load(file_path, mmap_mode=mmap_mode)
     elif extension == ".cxi":  # output of PyNX phasing
         h5file = h5py.File(file_path, "r")
         # group_key = list(h5file.keys())[1]
@@ -1825,7 +1824,7 @@ def rotate_crystal(
     :param reference_axis: will align axis_to_align onto this vector,
      expressed in an orthonormal frame  x y z
     :param voxel_size: tuple, voxel size of the 3D array in z, y, and x (CXI convention)
-    :param fill_value: tuple of numeric values used in the RegularGridInterpolator
+    :param fill_value: tuple of numeric values used in the interpolation
      for points outside of the interpolation domain. The length of the tuple should
      be equal to the number of input arrays.
     :param rotation_matrix: optional numpy ndarray of shape (3, 3),
@@ -1980,25 +1979,19 @@ def rotate_crystal(
     old_y = np.arange(-nby // 2, nby // 2, 1) * voxel_size[1]
     old_x = np.arange(-nbx // 2, nbx // 2, 1) * voxel_size[2]
 
-    myz, myy, myx = np.meshgrid(old_z, old_y, old_x, indexing="ij")
-
-    new_x = (
-        rotation_matrix[0, 0] * myx
-        + rotation_matrix[0, 1] * myy
-        + rotation_matrix[0, 2] * myz
-    )
-    new_y = (
-        rotation_matrix[1, 0] * myx
-        + rotation_matrix[1, 1] * myy
-        + rotation_matrix[1, 2] * myz
-    )
-    new_z = (
-        rotation_matrix[2, 0] * myx
-        + rotation_matrix[2, 1] * myy
-        + rotation_matrix[2, 2] * myz
-    )
-    del myx, myy, myz
-    gc.collect()
+    # the grid is never materialized, the rotated positions are calculated by
+    # broadcasting its 1D axes and converted to fractional indices in the arrays,
+    # the voxel of index 0 being located at -n // 2 along each axis
+    old_z = old_z[:, np.newaxis, np.newaxis]
+    old_y = old_y[np.newaxis, :, np.newaxis]
+    old_x = old_x[np.newaxis, np.newaxis, :]
+    new_indices = np.empty((3, nbz, nby, nbx))
+    for row, (nb_voxels, voxel) in enumerate(zip((nbz, nby, nbx), voxel_size)):
+        # the rows of the rotation matrix are in the order (x, y, z)
+        matrix_row = rotation_matrix[2 - row]
+        new_indices[row] = (
+            matrix_row[0] * old_x + matrix_row[1] * old_y + matrix_row[2] * old_z
+        ) / voxel + (nb_voxels - nb_voxels // 2)
 
     ######################
     # interpolate arrays #
@@ -2009,23 +2002,9 @@ def rotate_crystal(
         array = array.astype(float)
 
         # interpolate array onto the new positions
-        rgi = RegularGridInterpolator(
-            (old_z, old_y, old_x),
-            array,
-            method="linear",
-            bounds_error=False,
-            fill_value=fill_value[idx],
-        )
-        rotated_array = rgi(
-            np.concatenate(
-                (
-                    new_z.reshape((1, new_z.size)),
-                    new_y.reshape((1, new_z.size)),
-                    new_x.reshape((1, new_z.size)),
-                )
-            ).transpose()
+        rotated_array = map_coordinates(
+            array, new_indices, order=1, mode="constant", cval=fill_value[idx]
         )
-        rotated_array = rotated_array.reshape((nbz, nby, nbx)).astype(array.dtype)
         output_arrays.append(rotated_array)
 
         if debugging[idx]:
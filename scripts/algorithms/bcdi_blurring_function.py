@@ -50,6 +50,9 @@ sigma_guess = (
     15  # in nm, sigma of the gaussian guess for the blurring function (e.g. mean PRTF)
 )
 rl_iterations = 50  # number of iterations for the Richardson-Lucy algorithm
+single_precision = True
+# True to run the Richardson-Lucy algorithm in single precision, it is faster and
+# needs half of the memory
 center_method = "max"
 # 'com' or 'max', method to determine the center of the blurring function for line cuts
 comment = ""  # string to add to the filename when saving, should start with "_"
@@ -118,6 +121,7 @@ valid.valid_container(
 )
 valid.valid_item(sigma_guess, allowed_types=Real, min_excluded=0, name=validation_name)
 valid.valid_item(rl_iterations, allowed_types=int, min_excluded=0, name=validation_name)
+valid.valid_item(single_precision, allowed_types=bool, name=validation_name)
 valid.valid_item(roi_width, allowed_types=int, min_excluded=0, name=validation_name)
 if center_method not in {"max", "com"}:
     raise ValueError('center_method should be either "com" or "max"')
@@ -138,7 +142,9 @@ if file_path.endswith("npz"):
 else:
     kwarg = {}
 
-obj, extension = util.load_file(file_path, **kwarg)
+# the reconstruction is only read until its modulus is calculated, a .npy file can
+# be memory-mapped instead of being loaded in memory
+obj, extension = util.load_file(file_path, mmap_mode="r", **kwarg)
 if extension == ".h5":
     comment = comment + "_mode"
 
@@ -157,12 +163,12 @@ if upsampling_factor > 1:
 # define the support #
 ######################
 obj = abs(obj)
-min_obj = obj[np.nonzero(obj)].min()
+is_null = obj == 0  # reused after the normalization
+min_obj = obj[~is_null].min()
 obj = obj / min_obj  # normalize to the non-zero min to avoid dividing by small numbers
-obj[obj == 0] = min_offset  # avoid dividing by 0
-support = np.zeros(obj.shape)
-support[obj >= isosurface_threshold * obj.max()] = 1
-support[support == 0] = min_offset
+obj[is_null] = min_offset  # avoid dividing by 0
+del is_null
+support = np.where(obj >= isosurface_threshold * obj.max(), 1.0, min_offset)
 
 if debug:
     gu.multislices_plot(
@@ -195,6 +201,10 @@ psf_guess = util.gaussian_window(
     debugging=debug,
 )
 psf_guess = psf_guess / min_obj  # rescale to the object original min
+if single_precision:
+    obj = obj.astype(np.float32)
+    support = support.astype(np.float32)
+    psf_guess = psf_guess.astype(np.float32)
 psf_partial_coh, error = algo.partial_coherence_rl(
     measured_intensity=obj,
     coherent_intensity=support,
@@ -99,7 +99,7 @@ else:
     else:
         colorscale_max = round(data.max())
 data[data <= photon_threshold] = 0
-data_min = data[np.nonzero(data)].min()
+data_min = data[data != 0].min()
 if logscale == 1:
     colorscale_min = round(np.log10(data_min))
 else:
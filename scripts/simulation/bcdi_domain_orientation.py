@@ -15,6 +15,7 @@ from tkinter import filedialog
 import gc
 import time
 import datetime
+import multiprocessing as mp
 import sys
 import bcdi.graph.graph_utils as gu
 from bcdi.experiment.detector import create_detector
@@ -67,7 +68,7 @@ energy = 8250  # in ev X-ray energy
 ##################
 # detector setup #
 ##################
-detector = "Eiger4M"  # "Eiger2M" or "Maxipix" or "Eiger4M"
+detector_name = "Eiger4M"  # "Eiger2M" or "Maxipix" or "Eiger4M"
 direct_beam = (
     1303,
     1127,
@@ -91,678 +92,707 @@ kernel_length = 11  # width of the 3D gaussian window
 debug = True  # True to see more plots
 correct_background = False  # True to create a 3D background
 bckg_method = "normalize"  # 'subtract' or 'normalize'
+single_proc = False  # do not use multiprocessing if True
 
 ##################################
 # end of user-defined parameters #
 ##################################
 
-#######################
-# Initialize detector #
-#######################
-detector = create_detector(name=detector, binning=binning, roi=roi_detector)
-
-###################
-# define colormap #
-###################
-bad_color = "1.0"  # white background
-colormap = gu.Colormap(bad_color=bad_color)
-my_cmap = colormap.cmap
-plt.ion()
-
-###################################
-# load experimental data and mask #
-###################################
-root = tk.Tk()
-root.withdraw()
-file_path = filedialog.askopenfilename(
-    initialdir=datadir, title="Select the data to fit", filetypes=[("NPZ", "*.npz")]
-)
-data = np.load(file_path)["data"]
-nz, ny, nx = data.shape
-print(
-    "Sparsity of the data:",
-    str("{:.2f}".format((data == 0).sum() / (nz * ny * nx) * 100)),
-    "%",
-)
-
-try:
-    file_path = filedialog.askopenfilename(
-        initialdir=datadir, title="Select the mask", filetypes=[("NPZ", "*.npz")]
-    )
-    mask = np.load(file_path)["mask"]
 
-    data[np.nonzero(mask)] = 0
-    del mask
-    gc.collect()
-except FileNotFoundError:
-    pass
+def correlate_angles(
+    lattice_list,
+    peaks_list,
+    pad_offset,
+    pivot,
+    array_shape,
+    alpha,
+    angles_qz,
+    angles_qy,
+    peak_shape,
+    bragg_peaks,
+    nonzero_indices,
+):
+    """
+    Correlate the experimental Bragg peaks with the rotated simulated lattice.
+
+    The lattice is rotated by alpha around qx, and by all combinations of angles_qz
+    and angles_qy around qz and qy.
+
+    :param lattice_list: non rotated list of Bragg peaks positions in pixels, output of
+     simu.lattice() with offset_indices=True
+    :param peaks_list: corresponding list of [[h1,l1,k1],[h2,l2,k2]...]
+    :param pad_offset: index shift of the origin for the padded q values
+    :param pivot: tuple, the pivot point position in pixels for the rotation
+    :param array_shape: shape of the 3D experimental data
+    :param alpha: rotation angle around qx in degrees
+    :param angles_qz: 1D array of rotation angles around qz in degrees
+    :param angles_qy: 1D array of rotation angles around qy in degrees
+    :param peak_shape: the 3D kernel to apply at each lattice point
+    :param bragg_peaks: 1D array, experimental Bragg peaks density at nonzero_indices.
+     The simulated array is created with the same dtype.
+    :param nonzero_indices: tuple of 1D arrays, indices of the experimental Bragg
+     peaks in the 3D array
+    :return: a 2D array of correlation values of shape (len(angles_qz), len(angles_qy))
+    """
+    corr = np.zeros((len(angles_qz), len(angles_qy)))
+    # only the voxels at nonzero_indices are used for the correlation, the same array
+    # can be reused for all iterations if these voxels are reset after each iteration
+    struct_array = np.zeros(array_shape, dtype=bragg_peaks.dtype)
+    for idy, beta in enumerate(angles_qz):
+        for idx, gamma in enumerate(angles_qy):
+            rot_lattice, _ = simu.rotate_lattice(
+                lattice_list=lattice_list,
+                peaks_list=peaks_list,
+                original_shape=array_shape,
+                pad_offset=pad_offset,
+                pivot=pivot,
+                euler_angles=(alpha, beta, gamma),
+            )
+            # peaks in the format [[h, l, k], ...]:
+            # CXI convention downstream , vertical up, outboard
+
+            # assign the peak shape to each lattice point
+            simu.assign_peakshape(
+                array_shape=array_shape,
+                lattice_list=rot_lattice,
+                peak_shape=peak_shape,
+                pivot=pivot,
+                out=struct_array,
+            )
 
-try:
+            # calculate the correlation between experimental data and simulated data
+            corr[idy, idx] = np.dot(bragg_peaks, struct_array[nonzero_indices])
+            struct_array[nonzero_indices] = 0
+    return corr
+
+
+def main(user_comment):
+    """
+    Protection for multiprocessing.
+
+    :param user_comment: comment to include in the filename when saving results
+    """
+    comment = user_comment
+
+    #######################
+    # Initialize detector #
+    #######################
+    detector = create_detector(name=detector_name, binning=binning, roi=roi_detector)
+
+    ###################
+    # define colormap #
+    ###################
+    bad_color = "1.0"  # white background
+    colormap = gu.Colormap(bad_color=bad_color)
+    my_cmap = colormap.cmap
+    plt.ion()
+
+    ###################################
+    # load experimental data and mask #
+    ###################################
+    root = tk.Tk()
+    root.withdraw()
     file_path = filedialog.askopenfilename(
-        initialdir=datadir, title="Select q values", filetypes=[("NPZ", "*.npz")]
+        initialdir=datadir, title="Select the data to fit", filetypes=[("NPZ", "*.npz")]
     )
-    exp_qvalues = np.load(file_path)
-    qvalues_flag = True
-except FileNotFoundError:
-    exp_qvalues = None
-    qvalues_flag = False
-
-##########################
-# apply photon threshold #
-##########################
-data[data < photon_threshold] = 0
-print(
-    "Sparsity of the data after photon threshold:",
-    str("{:.2f}".format((data == 0).sum() / (nz * ny * nx) * 100)),
-    "%",
-)
-
-######################
-# calculate q values #
-######################
-if unitcell == "bct":
-    pivot, _, q_values, _, _ = simu.lattice(
-        energy=energy,
-        sdd=sdd,
-        direct_beam=direct_beam,
-        detector=detector,
-        unitcell=unitcell,
-        unitcell_param=[unitcell_ranges[0], unitcell_ranges[2]],
-        euler_angles=[0, 0, 0],
-        offset_indices=True,
-    )
-else:
-    pivot, _, q_values, _, _ = simu.lattice(
-        energy=energy,
-        sdd=sdd,
-        direct_beam=direct_beam,
-        detector=detector,
-        unitcell=unitcell,
-        unitcell_param=unitcell_ranges[0],
-        euler_angles=[0, 0, 0],
-        offset_indices=True,
+    data = np.load(file_path)["data"]
+    nz, ny, nx = data.shape
+    print(
+        "Sparsity of the data:",
+        str("{:.2f}".format((data == 0).sum() / (nz * ny * nx) * 100)),
+        "%",
     )
 
-nbz, nby, nbx = len(q_values[0]), len(q_values[1]), len(q_values[2])
-comment = (
-    comment
-    + str(nbz)
-    + "_"
-    + str(nby)
-    + "_"
-    + str(nbx)
-    + "_"
-    + str(binning[0])
-    + "_"
-    + str(binning[1])
-    + "_"
-    + str(binning[2])
-)
-
-if (nbz != nz) or (nby != ny) or (nbx != nx):
+    try:
+        file_path = filedialog.askopenfilename(
+            initialdir=datadir, title="Select the mask", filetypes=[("NPZ", "*.npz")]
+        )
+        mask = np.load(file_path)["mask"]
+
+        data[np.nonzero(mask)] = 0
+        del mask
+        gc.collect()
+    except FileNotFoundError:
+        pass
+
+    try:
+        file_path = filedialog.askopenfilename(
+            initialdir=datadir, title="Select q values", filetypes=[("NPZ", "*.npz")]
+        )
+        exp_qvalues = np.load(file_path)
+        qvalues_flag = True
+    except FileNotFoundError:
+        exp_qvalues = None
+        qvalues_flag = False
+
+    ##########################
+    # apply photon threshold #
+    ##########################
+    data[data < photon_threshold] = 0
     print(
-        "The experimental data and calculated q values have different shape,"
-        ' check "roi_detector" parameter!'
+        "Sparsity of the data after photon threshold:",
+        str("{:.2f}".format((data == 0).sum() / (nz * ny * nx) * 100)),
+        "%",
     )
-    sys.exit()
 
-print("Origin of the reciprocal space at pixel", pivot)
+    ######################
+    # calculate q values #
+    ######################
+    if unitcell == "bct":
+        pivot, _, q_values, _, _ = simu.lattice(
+            energy=energy,
+            sdd=sdd,
+            direct_beam=direct_beam,
+            detector=detector,
+            unitcell=unitcell,
+            unitcell_param=[unitcell_ranges[0], unitcell_ranges[2]],
+            euler_angles=[0, 0, 0],
+            offset_indices=True,
+        )
+    else:
+        pivot, _, q_values, _, _ = simu.lattice(
+            energy=energy,
+            sdd=sdd,
+            direct_beam=direct_beam,
+            detector=detector,
+            unitcell=unitcell,
+            unitcell_param=unitcell_ranges[0],
+            euler_angles=[0, 0, 0],
+            offset_indices=True,
+        )
 
-##########################
-# plot experimental data #
-##########################
-if debug:
-    gu.multislices_plot(
-        data,
-        sum_frames=True,
-        title="data",
-        vmin=0,
-        vmax=np.log10(data).max(),
-        scale="log",
-        plot_colorbar=True,
-        cmap=my_cmap,
-        is_orthogonal=True,
-        reciprocal_space=True,
+    nbz, nby, nbx = len(q_values[0]), len(q_values[1]), len(q_values[2])
+    comment = (
+        comment
+        + str(nbz)
+        + "_"
+        + str(nby)
+        + "_"
+        + str(nbx)
+        + "_"
+        + str(binning[0])
+        + "_"
+        + str(binning[1])
+        + "_"
+        + str(binning[2])
     )
 
-    if qvalues_flag:
-        gu.contour_slices(
+    if (nbz != nz) or (nby != ny) or (nbx != nx):
+        print(
+            "The experimental data and calculated q values have different shape,"
+            ' check "roi_detector" parameter!'
+        )
+        sys.exit()
+
+    print("Origin of the reciprocal space at pixel", pivot)
+
+    ##########################
+    # plot experimental data #
+    ##########################
+    if debug:
+        gu.multislices_plot(
             data,
-            q_coordinates=(exp_qvalues["qx"], exp_qvalues["qz"], exp_qvalues["qy"]),
             sum_frames=True,
-            title="Experimental data",
-            levels=np.linspace(0, np.log10(data.max()) + 1, 20, endpoint=False),
+            title="data",
+            vmin=0,
+            vmax=np.log10(data).max(),
             scale="log",
-            plot_colorbar=False,
+            plot_colorbar=True,
+            cmap=my_cmap,
             is_orthogonal=True,
             reciprocal_space=True,
         )
-    else:
-        gu.contour_slices(
+
+        if qvalues_flag:
+            gu.contour_slices(
+                data,
+                q_coordinates=(exp_qvalues["qx"], exp_qvalues["qz"], exp_qvalues["qy"]),
+                sum_frames=True,
+                title="Experimental data",
+                levels=np.linspace(0, np.log10(data.max()) + 1, 20, endpoint=False),
+                scale="log",
+                plot_colorbar=False,
+                is_orthogonal=True,
+                reciprocal_space=True,
+            )
+        else:
+            gu.contour_slices(
+                data,
+                q_coordinates=q_values,
+                sum_frames=True,
+                title="Experimental data",
+                levels=np.linspace(0, np.log10(data.max()) + 1, 20, endpoint=False),
+                scale="log",
+                plot_colorbar=False,
+                is_orthogonal=True,
+                reciprocal_space=True,
+            )
+
+    ################################################
+    # remove background from the experimental data #
+    ################################################
+    if correct_background:
+        file_path = filedialog.askopenfilename(
+            initialdir=datadir,
+            title="Select the 1D background file",
+            filetypes=[("NPZ", "*.npz")],
+        )
+        avg_background = np.load(file_path)["background"]
+        distances = np.load(file_path)["distances"]
+
+        if qvalues_flag:
+            data = util.remove_avg_background(
+                array=data,
+                avg_background=avg_background,
+                avg_qvalues=distances,
+                q_values=(exp_qvalues["qx"], exp_qvalues["qz"], exp_qvalues["qy"]),
+                method=bckg_method,
+            )
+        else:
+            print("Using calculated q values for background subtraction")
+            data = util.remove_avg_background(
+                array=data,
+                q_values=q_values,
+                avg_background=avg_background,
+                avg_qvalues=distances,
+                method=bckg_method,
+            )
+
+        np.savez_compressed(datadir + "data-background_" + comment + ".npz", data=data)
+
+        gu.multislices_plot(
             data,
-            q_coordinates=q_values,
             sum_frames=True,
-            title="Experimental data",
-            levels=np.linspace(0, np.log10(data.max()) + 1, 20, endpoint=False),
+            title="Background subtracted data",
+            vmin=0,
+            vmax=np.log10(data).max(),
             scale="log",
-            plot_colorbar=False,
+            plot_colorbar=True,
+            cmap=my_cmap,
             is_orthogonal=True,
             reciprocal_space=True,
         )
 
-################################################
-# remove background from the experimental data #
-################################################
-if correct_background:
-    file_path = filedialog.askopenfilename(
-        initialdir=datadir,
-        title="Select the 1D background file",
-        filetypes=[("NPZ", "*.npz")],
-    )
-    avg_background = np.load(file_path)["background"]
-    distances = np.load(file_path)["distances"]
-
-    if qvalues_flag:
-        data = util.remove_avg_background(
-            array=data,
-            avg_background=avg_background,
-            avg_qvalues=distances,
-            q_values=(exp_qvalues["qx"], exp_qvalues["qz"], exp_qvalues["qy"]),
-            method=bckg_method,
-        )
-    else:
-        print("Using calculated q values for background subtraction")
-        data = util.remove_avg_background(
-            array=data,
-            q_values=q_values,
-            avg_background=avg_background,
-            avg_qvalues=distances,
-            method=bckg_method,
-        )
+    #############################################
+    # find Bragg peaks in the experimental data #
+    #############################################
+    density_map = np.copy(data)
 
-    np.savez_compressed(datadir + "data-background_" + comment + ".npz", data=data)
-
-    gu.multislices_plot(
-        data,
-        sum_frames=True,
-        title="Background subtracted data",
-        vmin=0,
-        vmax=np.log10(data).max(),
-        scale="log",
-        plot_colorbar=True,
-        cmap=my_cmap,
-        is_orthogonal=True,
-        reciprocal_space=True,
+    # find peaks
+    local_maxi = peak_local_max(
+        density_map, exclude_border=False, min_distance=min_distance, indices=True
     )
+    nb_peaks = local_maxi.shape[0]
+    print("Number of Bragg peaks isolated:", nb_peaks)
+    print("Bragg peaks positions:")
+    print(local_maxi)
+
+    density_map[:] = 0
+
+    for idx in range(nb_peaks):
+        piz, piy, pix = local_maxi[idx]
+        density_map[
+            piz - peak_width : piz + peak_width + 1,
+            piy - peak_width : piy + peak_width + 1,
+            pix - peak_width : pix + peak_width + 1,
+        ] = 1
+
+    nonzero_indices = np.nonzero(density_map)
+    # 1D array of length: nb_peaks*(2*peak_width+1)**3, single precision is enough
+    # for the correlation and halves the memory of the simulated arrays
+    bragg_peaks = density_map[nonzero_indices].astype(np.float32)
+
+    if debug:
+        gu.multislices_plot(
+            density_map,
+            sum_frames=True,
+            title="Bragg peaks positions",
+            slice_position=pivot,
+            vmin=0,
+            vmax=1,
+            scale="linear",
+            cmap=my_cmap,
+            is_orthogonal=True,
+            reciprocal_space=True,
+        )
+        plt.pause(0.1)
 
-#############################################
-# find Bragg peaks in the experimental data #
-#############################################
-density_map = np.copy(data)
-
-# find peaks
-local_maxi = peak_local_max(
-    density_map, exclude_border=False, min_distance=min_distance, indices=True
-)
-nb_peaks = local_maxi.shape[0]
-print("Number of Bragg peaks isolated:", nb_peaks)
-print("Bragg peaks positions:")
-print(local_maxi)
-
-density_map[:] = 0
-
-for idx in range(nb_peaks):
-    piz, piy, pix = local_maxi[idx]
-    density_map[
-        piz - peak_width : piz + peak_width + 1,
-        piy - peak_width : piy + peak_width + 1,
-        pix - peak_width : pix + peak_width + 1,
-    ] = 1
-
-nonzero_indices = np.nonzero(density_map)
-bragg_peaks = density_map[
-    nonzero_indices
-]  # 1D array of length: nb_peaks*(2*peak_width+1)**3
-
-if debug:
-    gu.multislices_plot(
-        density_map,
-        sum_frames=True,
-        title="Bragg peaks positions",
-        slice_position=pivot,
-        vmin=0,
-        vmax=1,
-        scale="linear",
-        cmap=my_cmap,
-        is_orthogonal=True,
-        reciprocal_space=True,
+    #########################
+    # define the peak shape #
+    #########################
+    peak_shape = pu.blackman_window(
+        shape=(kernel_length, kernel_length, kernel_length), normalization=100
     )
-    plt.pause(0.1)
 
-#########################
-# define the peak shape #
-#########################
-peak_shape = pu.blackman_window(
-    shape=(kernel_length, kernel_length, kernel_length), normalization=100
-)
-
-#####################################
-# define the list of angles to test #
-#####################################
-angles_qx = np.linspace(
-    start=angles_ranges[0],
-    stop=angles_ranges[1],
-    num=max(1, np.rint((angles_ranges[1] - angles_ranges[0]) / angular_step) + 1),
-)
-angles_qz = np.linspace(
-    start=angles_ranges[2],
-    stop=angles_ranges[3],
-    num=max(1, np.rint((angles_ranges[3] - angles_ranges[2]) / angular_step) + 1),
-)
-angles_qy = np.linspace(
-    start=angles_ranges[4],
-    stop=angles_ranges[5],
-    num=max(1, np.rint((angles_ranges[5] - angles_ranges[4]) / angular_step) + 1),
-)
-nb_angles = len(angles_qx) * len(angles_qz) * len(angles_qy)
-print("Number of angles to test: ", nb_angles)
-
-####################################################
-# loop over rotation angles and lattice parameters #
-####################################################
-start = time.time()
-if unitcell == "bct":
-    a_values = np.linspace(
-        start=unitcell_ranges[0],
-        stop=unitcell_ranges[1],
-        num=max(
-            1, np.rint((unitcell_ranges[1] - unitcell_ranges[0]) / unitcell_step) + 1
-        ),
+    #####################################
+    # define the list of angles to test #
+    #####################################
+    angles_qx = np.linspace(
+        start=angles_ranges[0],
+        stop=angles_ranges[1],
+        num=max(1, np.rint((angles_ranges[1] - angles_ranges[0]) / angular_step) + 1),
     )
-    c_values = np.linspace(
-        start=unitcell_ranges[2],
-        stop=unitcell_ranges[3],
-        num=max(
-            1, np.rint((unitcell_ranges[3] - unitcell_ranges[2]) / unitcell_step) + 1
-        ),
+    angles_qz = np.linspace(
+        start=angles_ranges[2],
+        stop=angles_ranges[3],
+        num=max(1, np.rint((angles_ranges[3] - angles_ranges[2]) / angular_step) + 1),
     )
-    nb_lattices = len(a_values) * len(c_values)
-    print("Number of lattice parameters to test: ", nb_lattices)
-    print("Total number of iterations: ", nb_angles * nb_lattices)
-    corr = np.zeros(
-        (len(angles_qx), len(angles_qz), len(angles_qy), len(a_values), len(c_values))
+    angles_qy = np.linspace(
+        start=angles_ranges[4],
+        stop=angles_ranges[5],
+        num=max(1, np.rint((angles_ranges[5] - angles_ranges[4]) / angular_step) + 1),
     )
-    for idz, alpha in enumerate(angles_qx):
-        for idy, beta in enumerate(angles_qz):
-            for idx, gamma in enumerate(angles_qy):
-                for idw, a in enumerate(a_values):
-                    for idv, c in enumerate(c_values):
-                        _, _, _, rot_lattice, _ = simu.lattice(
-                            energy=energy,
-                            sdd=sdd,
-                            direct_beam=direct_beam,
-                            detector=detector,
-                            unitcell=unitcell,
-                            unitcell_param=(a, c),
-                            euler_angles=(alpha, beta, gamma),
-                            offset_indices=False,
-                        )
-                        # peaks in the format [[h, l, k], ...]:
-                        # CXI convention downstream , vertical up, outboard
-
-                        # assign the peak shape to each lattice point
-                        struct_array = simu.assign_peakshape(
-                            array_shape=(nbz, nby, nbx),
-                            lattice_list=rot_lattice,
-                            peak_shape=peak_shape,
-                            pivot=pivot,
-                        )
-
-                        # calculate the correlation between experimental data
-                        # and simulated data
-                        corr[idz, idy, idx, idw, idv] = np.multiply(
-                            bragg_peaks, struct_array[nonzero_indices]
-                        ).sum()
-else:
-    a_values = np.linspace(
-        start=unitcell_ranges[0],
-        stop=unitcell_ranges[1],
-        num=max(
-            1, np.rint((unitcell_ranges[1] - unitcell_ranges[0]) / unitcell_step) + 1
-        ),
-    )
-    nb_lattices = len(a_values)
-    print("Number of lattice parameters to test: ", nb_lattices)
-    print("Total number of iterations: ", nb_angles * nb_lattices)
-    corr = np.zeros((len(angles_qx), len(angles_qz), len(angles_qy), len(a_values)))
-    for idz, alpha in enumerate(angles_qx):
-        for idy, beta in enumerate(angles_qz):
-            for idx, gamma in enumerate(angles_qy):
-                for idw, a in enumerate(a_values):
-                    _, _, _, rot_lattice, _ = simu.lattice(
-                        energy=energy,
-                        sdd=sdd,
-                        direct_beam=direct_beam,
-                        detector=detector,
-                        unitcell=unitcell,
-                        unitcell_param=a,
-                        euler_angles=(alpha, beta, gamma),
-                        offset_indices=False,
-                    )
-                    # peaks in the format [[h, l, k], ...]:
-                    # CXI convention downstream , vertical up, outboard
-
-                    # assign the peak shape to each lattice point
-                    struct_array = simu.assign_peakshape(
-                        array_shape=(nbz, nby, nbx),
-                        lattice_list=rot_lattice,
-                        peak_shape=peak_shape,
-                        pivot=pivot,
+    nb_angles = len(angles_qx) * len(angles_qz) * len(angles_qy)
+    print("Number of angles to test: ", nb_angles)
+
+    ####################################################
+    # loop over rotation angles and lattice parameters #
+    ####################################################
+    start = time.time()
+    if unitcell == "bct":
+        a_values = np.linspace(
+            start=unitcell_ranges[0],
+            stop=unitcell_ranges[1],
+            num=max(
+                1,
+                np.rint((unitcell_ranges[1] - unitcell_ranges[0]) / unitcell_step) + 1,
+            ),
+        )
+        c_values = np.linspace(
+            start=unitcell_ranges[2],
+            stop=unitcell_ranges[3],
+            num=max(
+                1,
+                np.rint((unitcell_ranges[3] - unitcell_ranges[2]) / unitcell_step) + 1,
+            ),
+        )
+        nb_lattices = len(a_values) * len(c_values)
+        print("Number of lattice parameters to test: ", nb_lattices)
+        print("Total number of iterations: ", nb_angles * nb_lattices)
+        corr = np.zeros(
+            (
+                len(angles_qx),
+                len(angles_qz),
+                len(angles_qy),
+                len(a_values),
+                len(c_values),
+            )
+        )
+        # indices of the lattice parameters in corr: lattice parameters
+        lattice_params = {
+            (idw, idv): (a, c)
+            for idw, a in enumerate(a_values)
+            for idv, c in enumerate(c_values)
+        }
+    else:
+        a_values = np.linspace(
+            start=unitcell_ranges[0],
+            stop=unitcell_ranges[1],
+            num=max(
+                1,
+                np.rint((unitcell_ranges[1] - unitcell_ranges[0]) / unitcell_step) + 1,
+            ),
+        )
+        nb_lattices = len(a_values)
+        print("Number of lattice parameters to test: ", nb_lattices)
+        print("Total number of iterations: ", nb_angles * nb_lattices)
+        corr = np.zeros((len(angles_qx), len(angles_qz), len(angles_qy), len(a_values)))
+        # indices of the lattice parameters in corr: lattice parameter
+        lattice_params = {(idw,): a for idw, a in enumerate(a_values)}
+
+    if not single_proc:
+        print("\nNumber of processors: ", mp.cpu_count())
+        mp.freeze_support()
+        pool = mp.Pool(mp.cpu_count())  # use this number of processes
+        async_results = []
+
+    for lattice_indices, unitcell_param in lattice_params.items():
+        # the non rotated lattice does not depend on the angles,
+        # calculate it only once per set of lattice parameters
+        _, pad_offset, _, lattice_list, peaks_list = simu.lattice(
+            energy=energy,
+            sdd=sdd,
+            direct_beam=direct_beam,
+            detector=detector,
+            unitcell=unitcell,
+            unitcell_param=unitcell_param,
+            offset_indices=True,
+        )
+        for idz, alpha in enumerate(angles_qx):
+            # the rotations around qz and qy are looped over in the same task
+            corr_indices = (idz, slice(None), slice(None)) + lattice_indices
+            args = (
+                lattice_list,
+                peaks_list,
+                pad_offset,
+                pivot,
+                (nbz, nby, nbx),
+                alpha,
+                angles_qz,
+                angles_qy,
+                peak_shape,
+                bragg_peaks,
+                nonzero_indices,
+            )
+            if single_proc:
+                corr[corr_indices] = correlate_angles(*args)
+            else:
+                async_results.append(
+                    (
+                        corr_indices,
+                        pool.apply_async(
+                            correlate_angles, args=args, error_callback=util.catch_error
+                        ),
                     )
+                )
 
-                    # calculate the correlation between experimental data
-                    # and simulated data
-                    corr[idz, idy, idx, idw] = np.multiply(
-                        bragg_peaks, struct_array[nonzero_indices]
-                    ).sum()
-
-end = time.time()
-print(
-    "\nTime ellapsed in the loop over angles and lattice parameters:",
-    str(datetime.timedelta(seconds=int(end - start))),
-)
-
-##########################################
-# plot the correlation matrix at maximum #
-##########################################
-comment = comment + "_" + unitcell
-
-if unitcell == "bct":  # corr is 5D
-    piz, piy, pix, piw, piv = np.unravel_index(abs(corr).argmax(), corr.shape)
-    alpha, beta, gamma = angles_qx[piz], angles_qz[piy], angles_qy[pix]
-    best_param = a_values[piw], c_values[piv]
-    text = (
-        unitcell
-        + " unit cell of parameter(s) = {:.2f} nm, {:.2f}".format(
-            best_param[0], best_param[1]
-        )
-        + " nm"
-    )
+    if not single_proc:
+        # close the pool and let all the processes complete
+        pool.close()
+        pool.join()  # postpones the execution of next line of code until all
+        # processes in the queue are done.
+        for corr_indices, result in async_results:
+            corr[corr_indices] = result.get()
+
+    end = time.time()
     print(
-        "Maximum correlation for (angle_qx, angle_qz, angle_qy) = "
-        "{:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma)
+        "\nTime ellapsed in the loop over angles and lattice parameters:",
+        str(datetime.timedelta(seconds=int(end - start))),
     )
-    print("Maximum correlation for a", text)
-    corr_angles = np.copy(corr[:, :, :, piw, piv])
-    corr_lattice = np.copy(corr[piz, piy, pix, :, :])
-
-    vmin = corr_lattice.min()
-    vmax = 1.1 * corr_lattice.max()
-    save_lattice = True
-    if all(corr_lattice.shape[idx] > 1 for idx in range(corr_lattice.ndim)):  # 2D
-        fig, ax = plt.subplots(nrows=1, ncols=1)
-        plt0 = ax.contourf(
-            c_values,
-            a_values,
-            corr_lattice,
-            np.linspace(vmin, vmax, 20, endpoint=False),
-            cmap=my_cmap,
+
+    ##########################################
+    # plot the correlation matrix at maximum #
+    ##########################################
+    comment = comment + "_" + unitcell
+
+    if unitcell == "bct":  # corr is 5D
+        piz, piy, pix, piw, piv = np.unravel_index(abs(corr).argmax(), corr.shape)
+        alpha, beta, gamma = angles_qx[piz], angles_qz[piy], angles_qy[pix]
+        best_param = a_values[piw], c_values[piv]
+        text = (
+            unitcell
+            + " unit cell of parameter(s) = {:.2f} nm, {:.2f}".format(
+                best_param[0], best_param[1]
+            )
+            + " nm"
         )
-        plt.colorbar(plt0, ax=ax)
-        ax.set_ylabel("a parameter (nm)")
-        ax.set_xlabel("c parameter (nm)")
-        ax.set_title("Correlation map for lattice parameters")
-    else:  # 1D or 0D
-        nonzero_dim = np.nonzero(np.asarray(corr_lattice.shape) != 1)[0]
-        if len(nonzero_dim) == 0:  # 0D
-            print("The unit cell lattice parameters are not scanned")
-            save_lattice = False
-        else:  # 1D
-            corr_lattice = np.squeeze(corr_lattice)
-            labels = ["a parameter (nm)", "c parameter (nm)"]
-            fig = plt.figure()
-            if nonzero_dim[0] == 0:
-                plt.plot(a_values, corr_lattice, ".-r")
-            else:  # index 1
-                plt.plot(c_values, corr_lattice, ".-r")
-            plt.xlabel(labels[nonzero_dim[0]])
-            plt.ylabel("Correlation")
-    plt.pause(0.1)
-    if save_lattice:
+        print(
+            "Maximum correlation for (angle_qx, angle_qz, angle_qy) = "
+            "{:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma)
+        )
+        print("Maximum correlation for a", text)
+        corr_angles = np.copy(corr[:, :, :, piw, piv])
+        corr_lattice = np.copy(corr[piz, piy, pix, :, :])
+
+        vmin = corr_lattice.min()
+        vmax = 1.1 * corr_lattice.max()
+        save_lattice = True
+        if all(corr_lattice.shape[idx] > 1 for idx in range(corr_lattice.ndim)):  # 2D
+            fig, ax = plt.subplots(nrows=1, ncols=1)
+            plt0 = ax.contourf(
+                c_values,
+                a_values,
+                corr_lattice,
+                np.linspace(vmin, vmax, 20, endpoint=False),
+                cmap=my_cmap,
+            )
+            plt.colorbar(plt0, ax=ax)
+            ax.set_ylabel("a parameter (nm)")
+            ax.set_xlabel("c parameter (nm)")
+            ax.set_title("Correlation map for lattice parameters")
+        else:  # 1D or 0D
+            nonzero_dim = np.nonzero(np.asarray(corr_lattice.shape) != 1)[0]
+            if len(nonzero_dim) == 0:  # 0D
+                print("The unit cell lattice parameters are not scanned")
+                save_lattice = False
+            else:  # 1D
+                corr_lattice = np.squeeze(corr_lattice)
+                labels = ["a parameter (nm)", "c parameter (nm)"]
+                fig = plt.figure()
+                if nonzero_dim[0] == 0:
+                    plt.plot(a_values, corr_lattice, ".-r")
+                else:  # index 1
+                    plt.plot(c_values, corr_lattice, ".-r")
+                plt.xlabel(labels[nonzero_dim[0]])
+                plt.ylabel("Correlation")
+        plt.pause(0.1)
+        if save_lattice:
+            plt.savefig(
+                savedir
+                + "correlation_lattice_"
+                + comment
+                + "_param a={:.2f}nm,c={:.2f}nm".format(best_param[0], best_param[1])
+                + ".png"
+            )
+
+    else:  # corr is 4D
+        piz, piy, pix, piw = np.unravel_index(abs(corr).argmax(), corr.shape)
+        alpha, beta, gamma = angles_qx[piz], angles_qz[piy], angles_qy[pix]
+        best_param = a_values[piw]
+        text = (
+            unitcell
+            + " unit cell of parameter = "
+            + str("{:.2f}".format(best_param))
+            + " nm"
+        )
+        print(
+            "Maximum correlation for (angle_qx, angle_qz, angle_qy) = "
+            "{:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma)
+        )
+        print("Maximum correlation for a", text)
+        corr_angles = np.copy(corr[:, :, :, piw])
+        corr_lattice = np.copy(corr[piz, piy, pix, :])
+
+        fig = plt.figure()
+        plt.plot(a_values, corr_lattice, ".r")
+        plt.xlabel("a parameter (nm)")
+        plt.ylabel("Correlation")
+        plt.pause(0.1)
         plt.savefig(
             savedir
             + "correlation_lattice_"
             + comment
-            + "_param a={:.2f}nm,c={:.2f}nm".format(best_param[0], best_param[1])
+            + "_param a={:.2f}nm".format(best_param)
             + ".png"
         )
 
-else:  # corr is 4D
-    piz, piy, pix, piw = np.unravel_index(abs(corr).argmax(), corr.shape)
-    alpha, beta, gamma = angles_qx[piz], angles_qz[piy], angles_qy[pix]
-    best_param = a_values[piw]
-    text = (
-        unitcell
-        + " unit cell of parameter = "
-        + str("{:.2f}".format(best_param))
-        + " nm"
-    )
-    print(
-        "Maximum correlation for (angle_qx, angle_qz, angle_qy) = "
-        "{:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma)
-    )
-    print("Maximum correlation for a", text)
-    corr_angles = np.copy(corr[:, :, :, piw])
-    corr_lattice = np.copy(corr[piz, piy, pix, :])
-
-    fig = plt.figure()
-    plt.plot(a_values, corr_lattice, ".r")
-    plt.xlabel("a parameter (nm)")
-    plt.ylabel("Correlation")
+    vmin = corr_angles.min()
+    vmax = 1.1 * corr_angles.max()
+    save_angles = True
+    if all(corr_angles.shape[idx] > 1 for idx in range(corr_angles.ndim)):  # 3D
+        fig, _, _ = gu.contour_slices(
+            corr_angles,
+            (angles_qx, angles_qz, angles_qy),
+            sum_frames=False,
+            title="Correlation map for rotation angles",
+            slice_position=[piz, piy, pix],
+            plot_colorbar=True,
+            levels=np.linspace(vmin, vmax, 20, endpoint=False),
+            is_orthogonal=True,
+            reciprocal_space=True,
+            cmap=my_cmap,
+        )
+        fig.text(0.60, 0.25, "Kernel size = " + str(kernel_length) + " pixels", size=12)
+    else:
+        # find which angle is 1D
+        nonzero_dim = np.nonzero(np.asarray(corr_angles.shape) != 1)[0]
+        corr_angles = np.squeeze(corr_angles)
+        labels = [
+            "rotation around qx (deg)",
+            "rotation around qz (deg)",
+            "rotation around qy (deg)",
+        ]
+        if corr_angles.ndim == 2:
+            fig, ax = plt.subplots(nrows=1, ncols=1)
+            if (nonzero_dim[0] == 0) and (nonzero_dim[1] == 1):
+                plt0 = ax.contourf(
+                    angles_qz,
+                    angles_qx,
+                    corr_angles,
+                    np.linspace(vmin, vmax, 20, endpoint=False),
+                    cmap=my_cmap,
+                )
+            elif (nonzero_dim[0] == 0) and (nonzero_dim[1] == 2):
+                plt0 = ax.contourf(
+                    angles_qy,
+                    angles_qx,
+                    corr_angles,
+                    np.linspace(vmin, vmax, 20, endpoint=False),
+                    cmap=my_cmap,
+                )
+            else:
+                plt0 = ax.contourf(
+                    angles_qy,
+                    angles_qz,
+                    corr_angles,
+                    np.linspace(vmin, vmax, 20, endpoint=False),
+                    cmap=my_cmap,
+                )
+            plt.colorbar(plt0, ax=ax)
+            ax.set_ylabel(labels[nonzero_dim[0]])
+            ax.set_xlabel(labels[nonzero_dim[1]])
+            ax.set_title("Correlation map for rotation angles")
+        else:  # 1D or 0D
+            if len(nonzero_dim) == 0:  # 0D
+                print("The unit cell rotation angles are not scanned")
+                save_angles = False
+            else:  # 1D
+                fig = plt.figure()
+                if nonzero_dim[0] == 0:
+                    plt.plot(angles_qx, corr_angles, ".-r")
+                elif nonzero_dim[0] == 1:
+                    plt.plot(angles_qz, corr_angles, ".-r")
+                else:  # index 2
+                    plt.plot(angles_qy, corr_angles, ".-r")
+                plt.xlabel(labels[nonzero_dim[0]])
+                plt.ylabel("Correlation")
+
     plt.pause(0.1)
-    plt.savefig(
-        savedir
-        + "correlation_lattice_"
-        + comment
-        + "_param a={:.2f}nm".format(best_param)
-        + ".png"
-    )
+    if save_angles:
+        plt.savefig(
+            savedir
+            + "correlation_angles_"
+            + comment
+            + "_rot_{:.2f}_{:.2f}_{:.2f}".format(alpha, beta, gamma)
+            + ".png"
+        )
 
-vmin = corr_angles.min()
-vmax = 1.1 * corr_angles.max()
-save_angles = True
-if all(corr_angles.shape[idx] > 1 for idx in range(corr_angles.ndim)):  # 3D
-    fig, _, _ = gu.contour_slices(
-        corr_angles,
-        (angles_qx, angles_qz, angles_qy),
-        sum_frames=False,
-        title="Correlation map for rotation angles",
-        slice_position=[piz, piy, pix],
-        plot_colorbar=True,
-        levels=np.linspace(vmin, vmax, 20, endpoint=False),
-        is_orthogonal=True,
-        reciprocal_space=True,
-        cmap=my_cmap,
+    ###################################################
+    # calculate the lattice at calculated best values #
+    ###################################################
+    _, _, _, rot_lattice, peaks = simu.lattice(
+        energy=energy,
+        sdd=sdd,
+        direct_beam=direct_beam,
+        detector=detector,
+        unitcell=unitcell,
+        unitcell_param=best_param,
+        euler_angles=(alpha, beta, gamma),
+        offset_indices=False,
     )
-    fig.text(0.60, 0.25, "Kernel size = " + str(kernel_length) + " pixels", size=12)
-else:
-    # find which angle is 1D
-    nonzero_dim = np.nonzero(np.asarray(corr_angles.shape) != 1)[0]
-    corr_angles = np.squeeze(corr_angles)
-    labels = [
-        "rotation around qx (deg)",
-        "rotation around qz (deg)",
-        "rotation around qy (deg)",
-    ]
-    if corr_angles.ndim == 2:
-        fig, ax = plt.subplots(nrows=1, ncols=1)
-        if (nonzero_dim[0] == 0) and (nonzero_dim[1] == 1):
-            plt0 = ax.contourf(
-                angles_qz,
-                angles_qx,
-                corr_angles,
-                np.linspace(vmin, vmax, 20, endpoint=False),
-                cmap=my_cmap,
-            )
-        elif (nonzero_dim[0] == 0) and (nonzero_dim[1] == 2):
-            plt0 = ax.contourf(
-                angles_qy,
-                angles_qx,
-                corr_angles,
-                np.linspace(vmin, vmax, 20, endpoint=False),
-                cmap=my_cmap,
-            )
-        else:
-            plt0 = ax.contourf(
-                angles_qy,
-                angles_qz,
-                corr_angles,
-                np.linspace(vmin, vmax, 20, endpoint=False),
-                cmap=my_cmap,
-            )
-        plt.colorbar(plt0, ax=ax)
-        ax.set_ylabel(labels[nonzero_dim[0]])
-        ax.set_xlabel(labels[nonzero_dim[1]])
-        ax.set_title("Correlation map for rotation angles")
-    else:  # 1D or 0D
-        if len(nonzero_dim) == 0:  # 0D
-            print("The unit cell rotation angles are not scanned")
-            save_angles = False
-        else:  # 1D
-            fig = plt.figure()
-            if nonzero_dim[0] == 0:
-                plt.plot(angles_qx, corr_angles, ".-r")
-            elif nonzero_dim[0] == 1:
-                plt.plot(angles_qz, corr_angles, ".-r")
-            else:  # index 2
-                plt.plot(angles_qy, corr_angles, ".-r")
-            plt.xlabel(labels[nonzero_dim[0]])
-            plt.ylabel("Correlation")
-
-plt.pause(0.1)
-if save_angles:
-    plt.savefig(
-        savedir
-        + "correlation_angles_"
-        + comment
-        + "_rot_{:.2f}_{:.2f}_{:.2f}".format(alpha, beta, gamma)
-        + ".png"
+    # peaks in the format [[h, l, k], ...]:
+    # CXI convention downstream , vertical up, outboard
+
+    nb_peaks = len(peaks)
+    print("Simulated Bragg peaks hkls and position:")
+    print("hlk (qx, qz, qy)       indices (in pixels)")
+    for idx in range(nb_peaks):
+        print(peaks[idx], " : ", rot_lattice[idx])
+    # assign the peak shape to each lattice point
+    struct_array = simu.assign_peakshape(
+        array_shape=(nbz, nby, nbx),
+        lattice_list=rot_lattice,
+        peak_shape=peak_shape,
+        pivot=pivot,
     )
 
-###################################################
-# calculate the lattice at calculated best values #
-###################################################
-_, _, _, rot_lattice, peaks = simu.lattice(
-    energy=energy,
-    sdd=sdd,
-    direct_beam=direct_beam,
-    detector=detector,
-    unitcell=unitcell,
-    unitcell_param=best_param,
-    euler_angles=(alpha, beta, gamma),
-    offset_indices=False,
-)
-# peaks in the format [[h, l, k], ...]:
-# CXI convention downstream , vertical up, outboard
-
-nb_peaks = len(peaks)
-print("Simulated Bragg peaks hkls and position:")
-print("hlk (qx, qz, qy)       indices (in pixels)")
-for idx in range(nb_peaks):
-    print(peaks[idx], " : ", rot_lattice[idx])
-# assign the peak shape to each lattice point
-struct_array = simu.assign_peakshape(
-    array_shape=(nbz, nby, nbx),
-    lattice_list=rot_lattice,
-    peak_shape=peak_shape,
-    pivot=pivot,
-)
-
-#######################################################
-# plot the overlay of experimental and simulated data #
-#######################################################
-if unitcell == "bct":
-    text = (
-        unitcell
-        + " unit cell of parameter(s) = {:.2f} nm, {:.2f}".format(
-            best_param[0], best_param[1]
+    #######################################################
+    # plot the overlay of experimental and simulated data #
+    #######################################################
+    if unitcell == "bct":
+        text = (
+            unitcell
+            + " unit cell of parameter(s) = {:.2f} nm, {:.2f}".format(
+                best_param[0], best_param[1]
+            )
+            + " nm"
+        )
+    else:
+        text = (
+            unitcell
+            + " unit cell of parameter(s) = "
+            + str("{:.2f}".format(best_param))
+            + " nm"
         )
-        + " nm"
-    )
-else:
-    text = (
-        unitcell
-        + " unit cell of parameter(s) = "
-        + str("{:.2f}".format(best_param))
-        + " nm"
-    )
 
-plot_max = 2 * peak_shape.sum(axis=0).max()
-density_map[np.nonzero(density_map)] = 10 * plot_max
-fig, _, _ = gu.multislices_plot(
-    struct_array + density_map,
-    sum_frames=True,
-    title="Overlay",
-    vmin=0,
-    vmax=plot_max,
-    plot_colorbar=True,
-    scale="linear",
-    is_orthogonal=True,
-    reciprocal_space=True,
-)
-fig.text(0.5, 0.25, "Energy = " + str(energy / 1000) + " keV", size=12)
-fig.text(0.5, 0.20, "SDD = " + str(sdd) + " m", size=12)
-fig.text(0.5, 0.15, text, size=12)
-fig.text(
-    0.5,
-    0.10,
-    "Rotation of the unit cell in degrees (Qx, Qz, Qy) ="
-    " {:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma),
-    size=12,
-)
-plt.pause(0.1)
-plt.savefig(
-    savedir
-    + "Overlay_"
-    + comment
-    + "_corr="
-    + str("{:.2f}".format(corr.max()))
-    + ".png"
-)
-
-if debug:
+    plot_max = 2 * peak_shape.sum(axis=0).max()
+    density_map[np.nonzero(density_map)] = 10 * plot_max
     fig, _, _ = gu.multislices_plot(
-        struct_array,
+        struct_array + density_map,
         sum_frames=True,
-        title="Simulated diffraction pattern",
+        title="Overlay",
         vmin=0,
         vmax=plot_max,
-        plot_colorbar=False,
-        scale="linear",
-        is_orthogonal=True,
-        reciprocal_space=True,
-    )
-    fig.text(0.5, 0.25, "Energy = " + str(energy / 1000) + " keV", size=12)
-    fig.text(0.5, 0.20, "SDD = " + str(sdd) + " m", size=12)
-    fig.text(0.5, 0.15, text, size=12)
-    fig.text(
-        0.5,
-        0.10,
-        "Rotation of the unit cell in degrees (Qx, Qz, Qy) ="
-        " {:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma),
-        size=12,
-    )
-    plt.pause(0.1)
-
-    fig, _, _ = gu.contour_slices(
-        struct_array,
-        q_coordinates=q_values,
-        sum_frames=True,
-        title="Simulated diffraction pattern",
-        cmap=my_cmap,
-        levels=np.linspace(
-            struct_array.min() + plot_max / 100, plot_max, 20, endpoint=False
-        ),
         plot_colorbar=True,
         scale="linear",
         is_orthogonal=True,
@@ -779,6 +809,68 @@ if debug:
         size=12,
     )
     plt.pause(0.1)
+    plt.savefig(
+        savedir
+        + "Overlay_"
+        + comment
+        + "_corr="
+        + str("{:.2f}".format(corr.max()))
+        + ".png"
+    )
+
+    if debug:
+        fig, _, _ = gu.multislices_plot(
+            struct_array,
+            sum_frames=True,
+            title="Simulated diffraction pattern",
+            vmin=0,
+            vmax=plot_max,
+            plot_colorbar=False,
+            scale="linear",
+            is_orthogonal=True,
+            reciprocal_space=True,
+        )
+        fig.text(0.5, 0.25, "Energy = " + str(energy / 1000) + " keV", size=12)
+        fig.text(0.5, 0.20, "SDD = " + str(sdd) + " m", size=12)
+        fig.text(0.5, 0.15, text, size=12)
+        fig.text(
+            0.5,
+            0.10,
+            "Rotation of the unit cell in degrees (Qx, Qz, Qy) ="
+            " {:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma),
+            size=12,
+        )
+        plt.pause(0.1)
+
+        fig, _, _ = gu.contour_slices(
+            struct_array,
+            q_coordinates=q_values,
+            sum_frames=True,
+            title="Simulated diffraction pattern",
+            cmap=my_cmap,
+            levels=np.linspace(
+                struct_array.min() + plot_max / 100, plot_max, 20, endpoint=False
+            ),
+            plot_colorbar=True,
+            scale="linear",
+            is_orthogonal=True,
+            reciprocal_space=True,
+        )
+        fig.text(0.5, 0.25, "Energy = " + str(energy / 1000) + " keV", size=12)
+        fig.text(0.5, 0.20, "SDD = " + str(sdd) + " m", size=12)
+        fig.text(0.5, 0.15, text, size=12)
+        fig.text(
+            0.5,
+            0.10,
+            "Rotation of the unit cell in degrees (Qx, Qz, Qy) ="
+            " {:.2f}, {:.2f}, {:.2f}".format(alpha, beta, gamma),
+            size=12,
+        )
+        plt.pause(0.1)
+
+    plt.ioff()
+    plt.show()
+
 
-plt.ioff()
-plt.show()
+if __name__ == "__main__":
+    main(user_comment=comment)
@@ -593,6 +593,23 @@ class TestDetector(fake_filesystem_unittest.TestCase):
         self.assertTrue(np.all(np.isclose(output[0], data)))
         self.assertTrue(np.all(np.isclose(output[1], mask)))
 
+    def test_saturation_correction_integer_data(self):
+        det = Maxipix("Maxipix")
+        det.saturation_threshold = 10.5
+        data = np.array([[10, 11], [12, 9]], dtype=np.int32)
+        mask = np.zeros((2, 2))
+        output = det._saturation_correction(data, mask, nb_frames=1)
+        self.assertTrue(np.array_equal(output[0], [[10, 0], [0, 9]]))
+        self.assertTrue(np.array_equal(output[1], [[0, 1], [1, 0]]))
+
+    def test_saturation_correction_threshold_above_dtype_range(self):
+        det = Eiger4M("Eiger4M")
+        data = np.full((3, 3), np.iinfo(np.int32).max, dtype=np.int32)
+        mask = np.zeros((3, 3))
+        output = det._saturation_correction(data, mask, nb_frames=1)
+        self.assertTrue(np.all(output[0] == np.iinfo(np.int32).max))
+        self.assertTrue(np.all(output[1] == 0))
+
     def test_saturation_correction_shape_mismatch(self):
         det = Maxipix("Maxipix")
         det.saturation_threshold = 10
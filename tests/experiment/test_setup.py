@@ -7,6 +7,7 @@
 #       authors:
 #         Jerome Carnis, carnis_jerome@yahoo.fr
 
+import numpy as np
 import unittest
 from bcdi.experiment.setup import Setup
 
@@ -25,5 +26,66 @@ class Test(unittest.TestCase):
             Setup()
 
 
+class TestTransformationBCDI(unittest.TestCase):
+    """Tests related to the transformation from the detector to the lab frame."""
+
+    def setUp(self):
+        self.setup = Setup(
+            beamline="ID01",
+            energy=9000,
+            distance=1,
+            outofplane_angle=35,
+            inplane_angle=-2,
+            tilt_angle=0.01,
+            rocking_angle="outofplane",
+            grazing_angle=(0,),
+        )
+        self.params = {
+            "array_shape": (32, 64, 48),
+            "tilt_angle": 0.01,
+            "pixel_x": 55e-6,
+            "pixel_y": 55e-6,
+            "direct_space": True,
+            "verbose": False,
+        }
+
+    def test_cached_matrix(self):
+        matrix, _ = self.setup.transformation_bcdi(**self.params)
+        matrix[:] = 0
+        cached, _ = self.setup.transformation_bcdi(**self.params)
+        self.assertFalse(np.allclose(cached, 0))
+
+    def test_geometry_changed(self):
+        matrix, _ = self.setup.transformation_bcdi(**self.params)
+        self.setup.energy = 10000
+        new_matrix, _ = self.setup.transformation_bcdi(**self.params)
+        self.assertFalse(np.allclose(matrix, new_matrix))
+
+    def test_least_recently_used_discarded(self):
+        self.setup.transformation_bcdi(**self.params)
+        first_key = next(iter(self.setup._transformation_matrices))
+        for energy in range(9001, 9032):
+            self.setup.energy = energy
+            self.setup.transformation_bcdi(**self.params)
+            self.setup.energy = 9000
+            # the first matrix is reused, it should be kept in the cache
+            self.setup.transformation_bcdi(**self.params)
+        self.setup.energy = 9032
+        self.setup.transformation_bcdi(**self.params)
+        self.assertIn(first_key, self.setup._transformation_matrices)
+        self.assertEqual(len(self.setup._transformation_matrices), 32)
+
+    def test_orthogonalize_vectors(self):
+        matrix, _ = self.setup.transformation_bcdi(**self.params)
+        del self.params["direct_space"]
+        vectors = np.array([[1, 2, 3], [-4, 0.5, 6]])
+        new_vectors = self.setup.orthogonalize_vectors(vectors=vectors, **self.params)
+        for vector, new_vector in zip(vectors, new_vectors):
+            # the matrix acts on vectors in the order (x, y, z)
+            expected = np.linalg.solve(matrix, vector[::-1])[::-1]
+            self.assertTrue(np.allclose(new_vector, expected))
+
+
 if __name__ == "__main__":
     run_tests(Test)
+    run_tests(TestTransformationBCDI)
@@ -7,6 +7,7 @@
 #       authors:
 #         Jerome Carnis, carnis_jerome@yahoo.fr
 
+import numpy as np
 import unittest
 import bcdi.simulation.simulation_utils as simu
 
@@ -24,5 +25,57 @@ class Test(unittest.TestCase):
         self.assertTrue(True)
 
 
+class TestAssignPeakshape(unittest.TestCase):
+    """Tests related to assign_peakshape."""
+
+    def setUp(self):
+        self.params = {
+            "array_shape": (20, 24, 28),
+            "lattice_list": [[5, 6, 7], [0, 23, 14], [12, 12, 25]],
+            "peak_shape": np.ones((5, 5, 5)),
+            "pivot": (10, 12, 14),
+        }
+
+    def test_out(self):
+        expected = simu.assign_peakshape(**self.params)
+        out = np.zeros(self.params["array_shape"])
+        array = simu.assign_peakshape(out=out, **self.params)
+        self.assertIs(array, out)
+        self.assertTrue(np.array_equal(out, expected))
+
+    def test_out_wrong_shape(self):
+        with self.assertRaises(ValueError):
+            simu.assign_peakshape(out=np.zeros((20, 24, 27)), **self.params)
+
+
+class TestRotateLattice(unittest.TestCase):
+    """Tests related to rotate_lattice."""
+
+    def setUp(self):
+        # pivot at (5, 6, 7) in a (10, 12, 14) array, padded by the array shape
+        self.params = {
+            "lattice_list": [[15, 18, 21], [18, 18, 21], [15, 22, 21], [15, 18, 30]],
+            "peaks_list": [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]],
+            "original_shape": (10, 12, 14),
+            "pad_offset": (10, 12, 14),
+            "pivot": (5, 6, 7),
+        }
+
+    def test_no_rotation(self):
+        lattice_pos, peaks = simu.rotate_lattice(**self.params)
+        # the last peak is outside of the data range
+        self.assertEqual(lattice_pos, [[5, 6, 7], [8, 6, 7], [5, 10, 7]])
+        self.assertEqual(peaks, [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+
+    def test_rotation_around_qx(self):
+        lattice_pos, peaks = simu.rotate_lattice(euler_angles=(90, 0, 0), **self.params)
+        # the peak along qz is rotated towards -qy, the peak along qy is rotated
+        # towards qz outside of the data range
+        self.assertEqual(lattice_pos, [[5, 6, 7], [8, 6, 7], [5, 6, 3]])
+        self.assertEqual(peaks, [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+
+
 if __name__ == "__main__":
     run_tests(Test)
+    run_tests(TestAssignPeakshape)
+    run_tests(TestRotateLattice)